@@ -6,30 +6,68 @@ enable CORS, and register route blueprints. Minimal setup for local dev.
 
 from __future__ import annotations
 
-from flask import Flask
+import atexit
+import importlib
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from flask import Flask, jsonify
 from flask_cors import CORS
 
 from app.config import Config, ensure_data_dirs
-from app.routes.ingest import ingest_bp
-from app.routes.search import search_bp
-from app.routes.upload import upload_bp
-from app.routes.generate import generate_bp
-from app.routes.runs import runs_bp
-from app.routes.refine import refine_bp
-from app.routes.docs import docs_bp
-
-# Load .env for local dev if available
-try:
-    from dotenv import load_dotenv  # type: ignore
-    load_dotenv()
-except Exception:
-    pass
+
+# (module, blueprint attribute) pairs; imported inside create_app() so that
+# `import app` stays cheap and heavy service deps load on first request.
+_BLUEPRINTS = [
+    ("app.routes.ingest", "ingest_bp"),
+    ("app.routes.search", "search_bp"),
+    ("app.routes.upload", "upload_bp"),
+    ("app.routes.generate", "generate_bp"),
+    ("app.routes.runs", "runs_bp"),
+    ("app.routes.refine", "refine_bp"),
+    ("app.routes.docs", "docs_bp"),
+]
+
+_log_listener: Optional[QueueListener] = None
+
+# Load .env for local dev if available (skipped outside dev: no import, no file walk)
+if os.getenv("ARTOS_ENV", "dev") == "dev":
+    try:
+        from dotenv import load_dotenv  # type: ignore
+        load_dotenv()
+    except Exception:
+        pass
+
+
+def _configure_logging(level: str) -> None:
+    """Route root logging through a queue so request threads never block on stderr.
+
+    Records are formatted and written by a background QueueListener; safe to
+    call more than once (only the first call installs handlers).
+    """
+    global _log_listener
+    root = logging.getLogger()
+    root.setLevel(level)
+    if _log_listener is not None:
+        return
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    stream = logging.StreamHandler()
+    stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    _log_listener = QueueListener(log_queue, stream, respect_handler_level=True)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+    root.addHandler(QueueHandler(log_queue))
 
 
 def create_app() -> Flask:
+    _configure_logging(Config.LOG_LEVEL)
     app = Flask(__name__)
     # Basic config
     app.config.from_object(Config)
+    # Data dirs are created once at startup; routes no longer re-check per request
     ensure_data_dirs()
     # Allow all origins for local development, including preflight for file upload
     CORS(
@@ -42,13 +80,14 @@ def create_app() -> Flask:
     )
 
     # Blueprints
-    app.register_blueprint(ingest_bp)
-    app.register_blueprint(search_bp)
-    app.register_blueprint(upload_bp)
-    app.register_blueprint(generate_bp)
-    app.register_blueprint(runs_bp)
-    app.register_blueprint(refine_bp)
-    app.register_blueprint(docs_bp)
+    for module_name, attr in _BLUEPRINTS:
+        module = importlib.import_module(module_name)
+        app.register_blueprint(getattr(module, attr))
+
+    @app.errorhandler(413)
+    def too_large(_err):
+        # Raised by Werkzeug when the body exceeds MAX_CONTENT_LENGTH
+        return jsonify({"error": f"File too large; max {Config.MAX_UPLOAD_MB} MB."}), 413
 
     @app.get("/health")
     def health():
@@ -2,61 +2,153 @@
 
 Provides a simple config object with data paths and chunking parameters.
 This keeps the rest of the codebase decoupled from direct env access.
+
+Environment variables are parsed exactly once: ``get_config()`` builds a
+frozen ``AppConfig`` on first call and caches it for the process lifetime.
+``Config`` is the module-level handle to that cached instance.
 """
 
 from __future__ import annotations
 
 import os
+from dataclasses import dataclass, field
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, FrozenSet, Mapping
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
 
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    return value
 
-class Config:
+
+@dataclass(frozen=True)
+class AppConfig:
     # Base
-    ARTOS_ENV = os.getenv("ARTOS_ENV", "dev")
-    DATA_DIR = os.getenv("ARTOS_DATA_DIR", os.path.abspath(os.path.join(os.getcwd(), "data")))
+    ARTOS_ENV: str = field(default_factory=lambda: os.getenv("ARTOS_ENV", "dev"))
+    LOG_LEVEL: str = field(default_factory=lambda: os.getenv("LOG_LEVEL", "INFO").upper())
+    DATA_DIR: str = field(
+        default_factory=lambda: os.getenv("ARTOS_DATA_DIR", os.path.abspath(os.path.join(os.getcwd(), "data")))
+    )
 
-    # Subdirs
-    FILES_DIR = os.path.join(DATA_DIR, "files")
-    INDEXES_DIR = os.path.join(DATA_DIR, "indexes")
-    RUNS_DIR = os.path.join(DATA_DIR, "runs")
-    DB_DIR = os.path.join(DATA_DIR, "db")
+    # Subdirs (derived from DATA_DIR in __post_init__)
+    FILES_DIR: str = field(init=False)
+    INDEXES_DIR: str = field(init=False)
+    RUNS_DIR: str = field(init=False)
+    DB_DIR: str = field(init=False)
+    EMBED_CACHE_DIR: str = field(init=False)
 
     # Chunking defaults
-    CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1100"))
-    CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "120"))
+    CHUNK_SIZE: int = field(default_factory=lambda: _env_int("CHUNK_SIZE", 1100))
+    CHUNK_OVERLAP: int = field(default_factory=lambda: _env_int("CHUNK_OVERLAP", 120))
+    # Worker processes for splitting large PDFs into chunks (1 = split inline)
+    CHUNK_WORKERS: int = field(default_factory=lambda: _env_int("CHUNK_WORKERS", min(4, os.cpu_count() or 1)))
 
     # Embedding/LLM placeholders (not used in this step)
     # Gemini embedding model via langchain-google-genai
-    EMBED_MODEL = os.getenv("EMBED_MODEL", "models/gemini-embedding-001")
+    EMBED_MODEL: str = field(default_factory=lambda: os.getenv("EMBED_MODEL", "models/gemini-embedding-001"))
+    # Texts per embedding request at ingest (Gemini accepts up to 100)
+    EMBED_BATCH_SIZE: int = field(default_factory=lambda: _env_int("EMBED_BATCH_SIZE", 100))
+    # Concurrent embedding requests at ingest (bounded to stay under rate limits)
+    EMBED_MAX_IN_FLIGHT: int = field(default_factory=lambda: _env_int("EMBED_MAX_IN_FLIGHT", 4))
     # Default chat model for generation (can override via env)
-    LLM_MODEL = os.getenv("LLM_MODEL", "gemini-2.5-flash")
+    LLM_MODEL: str = field(default_factory=lambda: os.getenv("LLM_MODEL", "gemini-2.5-flash"))
 
     # Upload limits and whitelist
-    MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "50"))
-    ALLOWED_EXTS = {".pdf", ".docx"}
+    MAX_UPLOAD_MB: int = field(default_factory=lambda: _env_int("MAX_UPLOAD_MB", 50))
+    # Request body cap picked up by Flask; 1 MiB headroom for the multipart envelope
+    MAX_CONTENT_LENGTH: int = field(init=False)
+    ALLOWED_EXTS: FrozenSet[str] = frozenset({".pdf", ".docx"})
+
+    # DOCX assembly: "python-docx" builds the file directly; "pandoc" converts Markdown
+    DOCX_BACKEND: str = field(default_factory=lambda: os.getenv("DOCX_BACKEND", "python-docx").lower())
+    # Port for a long-lived `pandoc server` (0 = spawn pandoc per render)
+    PANDOC_SERVER_PORT: int = field(default_factory=lambda: _env_int("PANDOC_SERVER_PORT", 0))
+
+    # Dense index: opt-in IVF-PQ for very large stores, tried before FAISS_INDEX_FACTORY
+    # ({nlist} ~ 4*sqrt(N) capped by training points, {m} = PQ sub-quantizers dividing
+    # the dimension; RFlat re-ranks with exact vectors so it can meet the recall bar).
+    # Training is slow at Gemini dimensions, so it is off by default (0 = never).
+    FAISS_IVFPQ_FACTORY: str = field(
+        default_factory=lambda: os.getenv("FAISS_IVFPQ_FACTORY", "IVF{nlist},PQ{m}x8,RFlat")
+    )
+    FAISS_IVFPQ_MIN_VECTORS: int = field(default_factory=lambda: _env_int("FAISS_IVFPQ_MIN_VECTORS", 0))
+    # Stores with at least FAISS_ANN_MIN_VECTORS vectors are rebuilt at ingest
+    # with this faiss.index_factory string instead of a flat scan (0 = never)
+    FAISS_INDEX_FACTORY: str = field(default_factory=lambda: os.getenv("FAISS_INDEX_FACTORY", "HNSW32"))
+    FAISS_ANN_MIN_VECTORS: int = field(default_factory=lambda: _env_int("FAISS_ANN_MIN_VECTORS", 2000))
+    # Smaller stores: scalar-quantized codes instead of fp32 ("" or "Flat" = exact)
+    FAISS_QUANTIZER: str = field(default_factory=lambda: os.getenv("FAISS_QUANTIZER", "SQ8"))
+    # Tried next if FAISS_QUANTIZER misses the recall bar (fp16: 2x fewer bytes, ~lossless)
+    FAISS_QUANTIZER_FALLBACK: str = field(default_factory=lambda: os.getenv("FAISS_QUANTIZER_FALLBACK", "SQfp16"))
+    # Either replacement is kept only if its recall@10 vs the exact index reaches this
+    FAISS_MIN_RECALL: float = field(default_factory=lambda: float(os.getenv("FAISS_MIN_RECALL", "0.95")))
+    # Query-time recall/speed knobs for HNSW (efSearch) and IVF (nprobe) indexes
+    FAISS_EF_SEARCH: int = field(default_factory=lambda: _env_int("FAISS_EF_SEARCH", 64))
+    FAISS_NPROBE: int = field(default_factory=lambda: _env_int("FAISS_NPROBE", 16))
+    # Serve stores with at least this many vectors from GPU(s) when faiss-gpu
+    # sees a device (0 = never); the saved index stays CPU
+    FAISS_GPU_MIN_VECTORS: int = field(default_factory=lambda: _env_int("FAISS_GPU_MIN_VECTORS", 100000))
 
     # Section-specific dense retrieval defaults (LangChain retriever)
     # NOTE: Removed duplicate, and removed risky score_threshold for "Risks".
-    SECTION_RETRIEVAL_CONFIGS = {
-        "Purpose": {
-            "search_type": "mmr",
-            "search_kwargs": {"k": 6, "lambda_mult": 0.75, "fetch_k": 20},
-        },
-        "Procedures": {
-            "search_type": "mmr",
-            "search_kwargs": {"k": 12, "lambda_mult": 0.25, "fetch_k": 40},
-        },
-        "Risks": {
-            # Use plain similarity (no threshold) to avoid empty results
-            "search_type": "similarity",
-            "search_kwargs": {"k": 12},
-        },
-        "Benefits": {
-            "search_type": "similarity",
-            "search_kwargs": {"k": 8},
-        },
-    }
-
-def ensure_data_dirs(cfg: Config = Config) -> None:
-    """Ensure required data directories exist."""
+    # Read-only (MappingProxyType all the way down) so it can be shared safely.
+    SECTION_RETRIEVAL_CONFIGS: Mapping[str, Mapping[str, Any]] = field(
+        default_factory=lambda: _freeze({
+            "Purpose": {
+                "search_type": "mmr",
+                "search_kwargs": {"k": 6, "lambda_mult": 0.75, "fetch_k": 20},
+            },
+            "Procedures": {
+                "search_type": "mmr",
+                "search_kwargs": {"k": 12, "lambda_mult": 0.25, "fetch_k": 40},
+            },
+            "Risks": {
+                # Use plain similarity (no threshold) to avoid empty results
+                "search_type": "similarity",
+                "search_kwargs": {"k": 12},
+            },
+            "Benefits": {
+                "search_type": "similarity",
+                "search_kwargs": {"k": 8},
+            },
+        })
+    )
+
+    def __post_init__(self) -> None:
+        # Frozen dataclass: derived values are set once via object.__setattr__
+        object.__setattr__(self, "FILES_DIR", os.path.join(self.DATA_DIR, "files"))
+        object.__setattr__(self, "INDEXES_DIR", os.path.join(self.DATA_DIR, "indexes"))
+        object.__setattr__(self, "RUNS_DIR", os.path.join(self.DATA_DIR, "runs"))
+        object.__setattr__(self, "DB_DIR", os.path.join(self.DATA_DIR, "db"))
+        object.__setattr__(self, "EMBED_CACHE_DIR", os.path.join(self.DATA_DIR, "cache", "embeds"))
+        object.__setattr__(self, "MAX_CONTENT_LENGTH", (self.MAX_UPLOAD_MB + 1) * 1024 * 1024)
+
+
+@lru_cache(maxsize=1)
+def get_config() -> AppConfig:
+    """Return the process-wide config, parsing the environment on first call."""
+    return AppConfig()
+
+
+Config = get_config()
+
+_dirs_ready = False
+
+
+def ensure_data_dirs(cfg: AppConfig = Config) -> None:
+    """Ensure required data directories exist.
+
+    Directories are created on the first call only; later calls are no-ops.
+    """
+    global _dirs_ready
+    if _dirs_ready:
+        return
     for p in [cfg.DATA_DIR, cfg.FILES_DIR, cfg.INDEXES_DIR, cfg.RUNS_DIR, cfg.DB_DIR]:
         os.makedirs(p, exist_ok=True)
+    _dirs_ready = True
@@ -6,33 +6,50 @@ Swagger UI page that renders the spec.
 
 from __future__ import annotations
 
+import hashlib
 import os
-from flask import Blueprint, Response, current_app
+from typing import Optional
+
+from flask import Blueprint, Response, request
 
 
 docs_bp = Blueprint("docs", __name__)
 
+_CACHE_CONTROL = "public, max-age=86400"
+
+
+# app/routes/docs.py → up two dirs to repo root, then docs/openapi.yaml
+_OPENAPI_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "docs", "openapi.yaml")
+)
+
+
+def _load_openapi() -> Optional[bytes]:
+    try:
+        with open(_OPENAPI_PATH, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
 
-def _repo_root() -> str:
-    # app/routes/docs.py → up two dirs to repo root
-    return os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+# The spec is static for the process lifetime: read it once and derive an ETag
+_YAML_BYTES = _load_openapi()
+_ETAG = '"' + hashlib.sha1(_YAML_BYTES).hexdigest() + '"' if _YAML_BYTES is not None else None
 
 
 @docs_bp.get("/openapi.yaml")
 def openapi_yaml() -> Response:
-    path = os.path.join(_repo_root(), "docs", "openapi.yaml")
-    if not os.path.exists(path):
+    if _YAML_BYTES is None:
         return Response("openapi.yaml not found", status=404)
-    with open(path, "rb") as f:
-        data = f.read()
+    headers = {"ETag": _ETAG, "Cache-Control": _CACHE_CONTROL}
+    if request.headers.get("If-None-Match") == _ETAG:
+        return Response(status=304, headers=headers)
     # Swagger UI accepts YAML content; text/yaml is fine
-    return Response(data, mimetype="text/yaml")
+    return Response(_YAML_BYTES, mimetype="text/yaml", headers=headers)
 
 
-@docs_bp.get("/docs")
-def swagger_ui() -> Response:
-    # Minimal Swagger UI using CDN assets; loads spec from /openapi.yaml
-    html = """
+# Minimal Swagger UI using CDN assets; loads spec from /openapi.yaml
+_SWAGGER_HTML = b"""
 <!doctype html>
 <html lang="en">
   <head>
@@ -63,6 +80,10 @@ def swagger_ui() -> Response:
     </script>
   </body>
   </html>
-    """.strip()
-    return Response(html, mimetype="text/html")
+""".strip()
+
+
+@docs_bp.get("/docs")
+def swagger_ui() -> Response:
+    return Response(_SWAGGER_HTML, mimetype="text/html", headers={"Cache-Control": _CACHE_CONTROL})
 
@@ -6,13 +6,13 @@ Supports multi-query retrieval per section, fuses results, and persists artifact
 
 from __future__ import annotations
 
-from typing import Any, Dict, List
+import logging
+import re
+from typing import TYPE_CHECKING, Any, Dict, List, Sequence
 
 from flask import Blueprint, jsonify, request
 
-from app.services.retrieval_service import RetrievalService
-from app.services.llm_service import LLMService
-from app.services.section_queries import SECTION_QUERIES
+from app.services.section_queries import DEFAULT_SECTIONS, SECTION_QUERIES
 from app.services.state_service import (
     create_run,
     finalize_run,
@@ -20,21 +20,31 @@ from app.services.state_service import (
     write_section_artifacts,
 )
 
+if TYPE_CHECKING:  # pragma: no cover
+    from app.services.llm_service import LLMService
+    from app.services.retrieval_service import RetrievalService
+
 generate_bp = Blueprint("generate", __name__)
 
+log = logging.getLogger(__name__)
 
-def _resp_error(message: str, status: int = 400):
-    return jsonify({"error": message}), status
+# Inline citation marker emitted by the writer, e.g. [[p. 12 | Section: 3]]
+_CITE_RE = re.compile(r"\[\[.+?\]\]")
 
 
-DEFAULT_SECTIONS = ["Purpose", "Procedures", "Risks", "Benefits"]
+def _resp_error(message: str, status: int = 400):
+    return jsonify({"error": message}), status
 
 
 @generate_bp.route("/generate", methods=["POST"])
 def generate():
+    # Deferred so the heavy LangChain/Gemini stack loads on first request
+    from app.services.llm_service import LLMService
+    from app.services.retrieval_service import RetrievalService
+
     payload: Dict[str, Any] = request.get_json(silent=True) or {}
     file_id = payload.get("file_id")
-    sections: List[str] = payload.get("sections") or DEFAULT_SECTIONS
+    sections: Sequence[str] = payload.get("sections") or DEFAULT_SECTIONS
     options = payload.get("options") or {}
     mode = options.get("mode", "dense")
     use_section_filter = bool(options.get("use_section_filter", False))
@@ -47,59 +57,41 @@ def generate():
         return _resp_error("No index found for file_id. Run /ingest first.", 404)
 
     run_id = create_run(file_id, index_id)
-    print(f"[RUN {run_id}] Starting parallel generation for sections: {sections}")
+    log.info("[RUN %s] Starting parallel generation for sections: %s", run_id, sections)
 
     from concurrent.futures import ThreadPoolExecutor, as_completed
 
-    def run_section(sec: str) -> tuple[str, Dict[str, Any]]:
-        # Create per-thread services to avoid shared-state contention
-        rsvc = RetrievalService()
-        lsvc = LLMService()
-
+    def run_section(sec: str, rsvc: RetrievalService, lsvc: LLMService) -> tuple[str, Dict[str, Any]]:
         queries = SECTION_QUERIES.get(sec, [])
         if isinstance(queries, str):  # backward compatibility
             queries = [queries]
 
         section_arg = sec if use_section_filter else None
-        print(f"[RUN {run_id}] [{sec}] Using {len(queries)} queries")
-
-        # Multi-query retrieval + fusion
-        all_hits: Dict[str, Dict[str, Any]] = {}
-        for q in queries:
-            print(f"[RUN {run_id}] [{sec}] → Query: {q[:80]}...")
-            results_list = rsvc.search(
-                index_id=index_id,
-                query=q,
-                section=section_arg,
-                mode=mode,
-                # Optional: bump per-query caps if you want more recall
-                # k_dense=20, k_final=20,
-            )
-            print(f"[RUN {run_id}] [{sec}] → Retrieved {len(results_list)} hits")
-            for r in results_list:
-                cid = r["chunk_id"]
-                if cid not in all_hits:
-                    all_hits[cid] = r
-                else:
-                    all_hits[cid]["score"] += r["score"]
-
-        hits = sorted(all_hits.values(), key=lambda x: x["score"], reverse=True)[:12]
-        print(f"[RUN {run_id}] [{sec}] Final fused hits: {len(hits)}")
-        # Log each chunk used for generation for visibility
-        for rank, h in enumerate(hits, start=1):
-            try:
-                cid = h.get("chunk_id")
-                page = h.get("page")
-                sect = h.get("section_path")
-                heading = h.get("heading_norm")
-                score = h.get("score")
-                print(
-                    f"[RUN {run_id}] [{sec}]  #{rank:02d} "
-                    f"chunk_id={cid} page={page} heading='{heading}' section='{sect}' score={score}"
+        log.info("[RUN %s] [%s] Using %d queries", run_id, sec, len(queries))
+
+        # Multi-query retrieval in one batch (index loaded once, query
+        # embeddings fetched together), RRF-fused across the query variants
+        hits: List[Dict[str, Any]] = rsvc.search_multi(
+            index_id,
+            queries,
+            section=section_arg,
+            mode=mode,
+            k_final=12,
+            # Optional: bump per-query caps if you want more recall
+            # k_dense=20,
+        )
+        log.info("[RUN %s] [%s] Final fused hits: %d", run_id, sec, len(hits))
+        # Log each chunk used for generation for visibility (skipped entirely
+        # when INFO is disabled)
+        if log.isEnabledFor(logging.INFO):
+            for rank, h in enumerate(hits, start=1):
+                cid, page, sect, heading, score = (
+                    h.get("chunk_id"), h.get("page"), h.get("section_path"), h.get("heading_norm"), h.get("score")
+                )
+                log.info(
+                    "[RUN %s] [%s]  #%02d chunk_id=%s page=%s heading='%s' section='%s' score=%s",
+                    run_id, sec, rank, cid, page, heading, sect, score,
                 )
-            except Exception:
-                # best-effort logging; do not fail generation on logging
-                pass
 
         # Facts (Procedures only) → write → self-check
         facts = lsvc.extract_procedure_facts(hits) if sec == "Procedures" else None
@@ -107,9 +99,9 @@ def generate():
         final = lsvc.self_check(sec, draft, hits)
 
         warnings: List[str] = []
-        if "[[" not in (final or "") or "]]" not in (final or ""):
+        if not _CITE_RE.search(final or ""):
             warnings.append("No inline citations detected in final text for this section.")
-            print(f"[RUN {run_id}] [{sec}] WARNING: No inline citations")
+            log.warning("[RUN %s] [%s] No inline citations", run_id, sec)
 
         # Persist section artifacts
         write_section_artifacts(
@@ -124,15 +116,25 @@ def generate():
 
         return sec, {"text": final}
 
+    # One service pair per run, shared by all section threads: both only hold
+    # config and API clients, so this reuses the Gemini client/connection pool
+    # instead of rebuilding it per section.
+    rsvc = RetrievalService()
+    lsvc = LLMService()
+
     results: Dict[str, Any] = {}
     # Tune max_workers as you like (I/O + network → threads are fine)
     with ThreadPoolExecutor(max_workers=min(4, len(sections))) as ex:
-        futures = [ex.submit(run_section, sec) for sec in sections]
+        # Procedures chains facts extraction → writer (the writer prompt needs the
+        # facts), making it the longest section; submit it first so it never
+        # queues behind other sections when there are more sections than workers.
+        ordered = sorted(sections, key=lambda s: s != "Procedures")
+        futures = [ex.submit(run_section, sec, rsvc, lsvc) for sec in ordered]
         for f in as_completed(futures):
             sec, out = f.result()
             results[sec] = out
 
     finalize_run(run_id, status="succeeded")
-    print(f"[RUN {run_id}] Completed parallel generation")
+    log.info("[RUN %s] Completed parallel generation", run_id)
 
     return jsonify({"run_id": run_id, "status": "succeeded", "sections": results})
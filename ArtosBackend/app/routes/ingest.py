@@ -2,14 +2,16 @@ from __future__ import annotations
 
 import os
 import time
-from typing import Any, Dict
+from typing import TYPE_CHECKING, Any, Dict
 import logging
 
 from flask import Blueprint, jsonify, request
 
-from app.config import Config, ensure_data_dirs
+from app.config import Config
 from app.services.state_service import create_index, resolve_file_path
-from app.services.vectorstore_service import VectorStoreService
+
+if TYPE_CHECKING:  # pragma: no cover
+    from app.services.vectorstore_service import VectorStoreService
 
 """Ingest route: POST /ingest
 
@@ -28,7 +30,6 @@ def _resp_error(message: str, status: int = 400):
 
 @ingest_bp.route("/ingest", methods=["POST"])
 def ingest():
-    ensure_data_dirs()
     payload: Dict[str, Any] = request.get_json(silent=True) or {}
     file_id = payload.get("file_id")
     
@@ -50,13 +51,16 @@ def ingest():
     logging.info(f"Processing PDF {file_id} → index {index_id}")
 
     # Let VectorStoreService handle EVERYTHING
+    from app.services.vectorstore_service import VectorStoreService
+
     vss = VectorStoreService()
     try:
         vstats = vss.build_from_pdf(path, file_id, index_id)
         
         # Extract response data from stats
         n_chunks = vstats.get("n_chunks", 0)
-        pages = vstats.get("chunk_stats", {}).get("total_chunks", 1)  # fallback
+        # Page count from the build itself (counted while streaming the PDF)
+        pages = vstats.get("pages", 1)
         toc_detected = vstats.get("toc_detected", False)
         text_enhanced = vstats.get("text_sections_enhanced", 0)
         
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
-from typing import Any, Dict
+from typing import TYPE_CHECKING, Any, Dict
 
 from flask import Blueprint, jsonify, request
 
-from app.services.refinement_service import RefinementService
+if TYPE_CHECKING:  # pragma: no cover
+    from app.services.refinement_service import RefinementService
 
 
 refine_bp = Blueprint("refine", __name__)
@@ -20,6 +21,8 @@ def refine():
     run_id = payload.get("run_id")
     file_id = payload.get("file_id")
     try:
+        from app.services.refinement_service import RefinementService
+
         svc = RefinementService()
         if run_id:
             out = svc.refine_run(run_id)
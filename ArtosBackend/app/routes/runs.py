@@ -7,34 +7,57 @@ a consolidated log JSON with provenance and facts. (DOCX download TBD.)
 from __future__ import annotations
 
 import os
-from typing import Any, Dict
+from typing import TYPE_CHECKING, Any, Dict
 
 from flask import Blueprint, jsonify, send_file
 
-from app.services.state_service import run_dir, build_and_write_run_logs
-from app.services.assembly_service import AssemblyService
+from app.services.state_service import build_and_write_run_logs, read_run_state, run_dir, set_run_docx
 from app.utils.io_utils import read_json
 
+if TYPE_CHECKING:  # pragma: no cover
+    from app.services.assembly_service import AssemblyService
+
 
 runs_bp = Blueprint("runs", __name__)
 
 
+def _send_docx(path: str):
+    # Conditional response: clients holding the same file get a 304, not the bytes.
+    # Refinement regenerates the DOCX at the same path, so clients must revalidate
+    # every time (no-cache) rather than reuse a stale copy.
+    resp = send_file(
+        path,
+        as_attachment=True,
+        conditional=True,
+        etag=True,
+        last_modified=os.path.getmtime(path),
+        max_age=0,
+    )
+    resp.cache_control.no_cache = True
+    return resp
+
+
 @runs_bp.get("/runs/<run_id>")
 def get_run(run_id: str):
+    # Fast path: a single consolidated state file per poll
+    state = read_run_state(run_id)
+    if state is not None:
+        return jsonify({"run_id": run_id, "status": state.get("status"), "sections": state.get("sections") or {}})
+
     rdir = run_dir(run_id)
     meta = read_json(os.path.join(rdir, "meta.json"), default=None)
     if not isinstance(meta, dict):
         return jsonify({"error": "run not found"}), 404
 
-    # Collect final texts per section
+    # Older runs without state.json: collect final texts per section
     sections_dir = os.path.join(rdir, "sections")
     sections: Dict[str, Any] = {}
     if os.path.isdir(sections_dir):
-        for name in os.listdir(sections_dir):
-            if not name.endswith(".json"):
-                continue
-            sec = os.path.splitext(name)[0]
-            data = read_json(os.path.join(sections_dir, name), default={}) or {}
+        with os.scandir(sections_dir) as it:
+            entries = [e for e in it if e.name.endswith(".json") and e.is_file()]
+        for entry in entries:
+            sec = entry.name[:-5]
+            data = read_json(entry.path, default={}) or {}
             sections[sec] = {
                 "text": data.get("final_text") or data.get("draft_text"),
                 "warnings": data.get("warnings") or [],
@@ -60,17 +83,20 @@ def get_run_logs(run_id: str):
 @runs_bp.get("/runs/<run_id>/docx")
 def get_run_docx(run_id: str):
     rdir = run_dir(run_id)
-    # If assembled doc exists, serve it; else build it
-    try:
-        for name in os.listdir(rdir):
-            if name.startswith("ICF_") and name.endswith(".docx"):
-                return send_file(os.path.join(rdir, name), as_attachment=True)
-    except Exception:
-        pass
+    # If assembled doc is recorded in meta.json and present, serve it; else build it
+    meta = read_json(os.path.join(rdir, "meta.json"), default={}) or {}
+    docx_name = meta.get("docx")
+    if docx_name:
+        docx_path = os.path.join(rdir, docx_name)
+        if os.path.exists(docx_path):
+            return _send_docx(docx_path)
     try:
+        from app.services.assembly_service import AssemblyService
+
         svc = AssemblyService()
         out = svc.render_docx(run_id)
-        return send_file(out, as_attachment=True)
+        set_run_docx(run_id, out)
+        return _send_docx(out)
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
@@ -6,11 +6,12 @@ returns top hits with metadata and fused scores for debugging/tuning.
 
 from __future__ import annotations
 
-from typing import Any, Dict
+from typing import TYPE_CHECKING, Any, Dict
 
 from flask import Blueprint, jsonify, request
 
-from app.services.retrieval_service import RetrievalService
+if TYPE_CHECKING:  # pragma: no cover
+    from app.services.retrieval_service import RetrievalService
 
 
 search_bp = Blueprint("search", __name__)
@@ -33,6 +34,8 @@ def search():
     if not index_id or not query:
         return _resp_error("Missing index_id or query.")
 
+    from app.services.retrieval_service import RetrievalService
+
     svc = RetrievalService()
     try:
         hits = svc.search(
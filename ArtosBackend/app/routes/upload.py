@@ -7,47 +7,43 @@ metadata: { file_id, filename, mime, size }.
 
 from __future__ import annotations
 
+import hashlib
 import os
 from typing import Any, Dict, Tuple
 
 from flask import Blueprint, jsonify, request
 
-from app.config import Config, ensure_data_dirs
+from app.config import Config
 from app.services.state_service import register_uploaded_file
 from app.utils.ids import new_id
-from app.utils.io_utils import ensure_dir, file_sha1
-
-try:
-    import fitz  # PyMuPDF
-except Exception:  # pragma: no cover
-    fitz = None  # type: ignore
+from app.utils.io_utils import ensure_dir
+from app.utils.pdf_utils import pdf_info
 
 
 upload_bp = Blueprint("upload", __name__)
 
+_COPY_CHUNK = 1024 * 1024
+
 
 def _resp_error(message: str, status: int = 400):
     return jsonify({"error": message}), status
 
 
 def _validate_pdf_not_encrypted(path: str) -> Tuple[bool, str]:
-    if fitz is None:
-        return True, ""
-    try:
-        doc = fitz.open(path)
-        # older versions: check needs_pass; newer: is_encrypted
-        needs = getattr(doc, "needs_pass", False) or getattr(doc, "is_encrypted", False)
-        if needs:
-            return False, "PDF is password-protected."
-        return True, ""
-    except Exception:
-        # If open fails, let ingest report issues later
-        return True, ""
+    info = pdf_info(path)
+    # If PyMuPDF is missing or open fails, let ingest report issues later
+    if info is not None and info[0]:
+        return False, "PDF is password-protected."
+    return True, ""
 
 
 @upload_bp.route("/upload", methods=["POST"])
 def upload():
-    ensure_data_dirs()
+    # Reject oversize bodies up front, before anything is written to disk
+    cl = request.content_length
+    if cl and cl > Config.MAX_CONTENT_LENGTH:
+        return _resp_error(f"File too large; max {Config.MAX_UPLOAD_MB} MB.", 413)
+
     if "file" not in request.files:
         return _resp_error("No file part in the request.")
     f = request.files["file"]
@@ -65,11 +61,22 @@ def upload():
     fdir = os.path.join(Config.FILES_DIR, file_id)
     ensure_dir(fdir)
     dest = os.path.join(fdir, f"source{ext}")
-    f.save(dest)
 
-    # Size check
-    size = os.path.getsize(dest)
-    if size > Config.MAX_UPLOAD_MB * 1024 * 1024:
+    # Stream to disk, hashing and size-checking in the same pass
+    max_bytes = Config.MAX_UPLOAD_MB * 1024 * 1024
+    h = hashlib.sha1()
+    size = 0
+    with open(dest, "wb") as out:
+        while True:
+            chunk = f.stream.read(_COPY_CHUNK)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                break
+            out.write(chunk)
+            h.update(chunk)
+    if size > max_bytes:
         try:
             os.remove(dest)
         except Exception:
@@ -86,7 +93,7 @@ def upload():
                 pass
             return _resp_error(msg)
 
-    sha1 = file_sha1(dest)
+    sha1 = h.hexdigest()
     rec = register_uploaded_file(
         file_id,
         filename=orig_name,
@@ -3,5 +3,38 @@
 Contains services for state/registries, vector stores, retrieval,
 LLM orchestration (role tagging, facts extraction, writer, self-check),
 and DOCX assembly. Each service will be imported by routes.
+
+Service classes are resolved lazily (PEP 562) so importing this package
+does not pull in LangChain, FAISS, or Pandoc until a service is used.
 """
 
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:  # pragma: no cover
+    from app.services.assembly_service import AssemblyService
+    from app.services.llm_service import LLMService
+    from app.services.refinement_service import RefinementService
+    from app.services.retrieval_service import RetrievalService
+    from app.services.vectorstore_service import VectorStoreService
+
+_LAZY_SERVICES = {
+    "AssemblyService": "app.services.assembly_service",
+    "LLMService": "app.services.llm_service",
+    "RefinementService": "app.services.refinement_service",
+    "RetrievalService": "app.services.retrieval_service",
+    "VectorStoreService": "app.services.vectorstore_service",
+}
+
+__all__ = list(_LAZY_SERVICES)
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_SERVICES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
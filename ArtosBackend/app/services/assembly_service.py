@@ -1,20 +1,35 @@
 # assembly_service_pandoc.py
 from __future__ import annotations
 
+import hashlib
+import logging
 import os
 import re
-from typing import Dict, List
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 from os.path import basename
 
-from app.config import Config
+from app.config import AppConfig, Config
+from app.utils.docx_utils import write_markdown_docx
 from app.utils.io_utils import read_json, ensure_dir
 
-try:
-    import pypandoc
-except ImportError:
-    raise ImportError(
-        "pypandoc is required. Install with `pip install pypandoc` and make sure the Pandoc binary is installed."
-    )
+log = logging.getLogger(__name__)
+
+PANDOC_FROM = "markdown+lists_without_preceding_blankline"
+
+
+@lru_cache(maxsize=1)
+def _pandoc_bin() -> str:
+    """Resolve the pandoc executable once per process."""
+    path = shutil.which("pandoc")
+    if not path:
+        raise RuntimeError(
+            "pandoc is required for DOCX assembly. Install it (e.g. `brew install pandoc` / `apt-get install pandoc`)."
+        )
+    return path
 
 # --- Inline ICF template scaffold ---
 # Keys are the visible DOCX headings (level-2 "##" in Markdown).
@@ -82,19 +97,57 @@ TEMPLATE_SECTIONS: Dict[str, str] = {
 NBSP = "\u00A0"
 GEN_SECTIONS = {"Purpose", "Procedures", "Risks", "Benefits"}
 
+# NBSP -> space, tab -> 4 spaces, in a single str.translate pass
+_NORM_TBL = str.maketrans({NBSP: " ", "\t": "    "})
+
+# Citation / list-marker patterns, compiled once at import
+_CIT_RX = re.compile(r"\[\[(.*?)\]\]")
+_CIT_KEEP_RX = re.compile(r"p\.\s*\d+(\s*\|\s*Section:\s*[\d\.]+)?")
+_CIT_PAGE_RX = re.compile(r"p\.\s*(\d+)")
+_BULLET_RX = re.compile(r'^(\s*)([*\-•])\s+(.*)$')
+_NUMBER_RX = re.compile(r'^(\s*)(\d+)[\.\)]\s+(.*)$')
+
+
+def _build_scaffold() -> List[Tuple[Optional[str], str]]:
+    """
+    Pre-render TEMPLATE_SECTIONS once into an ordered list of blocks:
+      - (None, markdown)     -> consecutive static sections, already joined
+      - (section, heading)   -> slot for a generated section
+    """
+    blocks: List[Tuple[Optional[str], str]] = []
+    static: List[str] = []
+    for heading, content in TEMPLATE_SECTIONS.items():
+        if content in GEN_SECTIONS:
+            if static:
+                blocks.append((None, "\n\n".join(static)))
+                static = []
+            blocks.append((content, heading))
+        else:
+            static.append(f"## {heading}\n\n{content or ''}\n")
+    if static:
+        blocks.append((None, "\n\n".join(static)))
+    return blocks
+
+
+# Static boilerplate never changes between runs, so it is rendered at import
+_SCAFFOLD = _build_scaffold()
+# Folded into each render fingerprint so template edits invalidate cached DOCX files
+_SCAFFOLD_DIGEST = hashlib.blake2b(repr(_SCAFFOLD).encode("utf-8"), digest_size=16).digest()
+
 
 class AssemblyService:
     """
-    DOCX assembly using Pandoc with Markdown normalization.
+    DOCX assembly from normalized Markdown.
 
     Flow:
       - Load section JSON (final_text or draft_text).
-      - Normalize Markdown so Pandoc reliably recognizes bullets/numbers.
+      - Normalize Markdown so bullets/numbers are recognized reliably.
       - Stitch into a single Markdown doc using TEMPLATE_SECTIONS (mix of static + generated).
-      - Convert to DOCX via Pandoc, optionally using templates/reference.docx to control styles.
+      - Write the DOCX with python-docx (default) or, with DOCX_BACKEND=pandoc, convert via
+        Pandoc; either way templates/reference.docx controls styles when present.
     """
 
-    def __init__(self, cfg: Config = Config):
+    def __init__(self, cfg: AppConfig = Config):
         self.cfg = cfg
         # reference_doc controls styles (not content)
         self.reference_doc = os.path.join(os.getcwd(), "templates", "reference.docx")
@@ -115,15 +168,21 @@ class AssemblyService:
         sections_dir = os.path.join(rdir, "sections")
         out: Dict[str, str] = {}
 
-        for key in GEN_SECTIONS:
-            path = os.path.join(sections_dir, f"{key}.json")
-            data = read_json(path, default=None)
+        # Independent small reads; overlap them (helps on network-backed volumes)
+        keys = list(GEN_SECTIONS)
+        paths = [os.path.join(sections_dir, f"{key}.json") for key in keys]
+        with ThreadPoolExecutor(max_workers=len(keys)) as ex:
+            loaded = list(ex.map(lambda p: read_json(p, default=None), paths))
+
+        for key, data in zip(keys, loaded):
             if isinstance(data, dict):
                 text = (data.get("final_text") or data.get("draft_text") or "").strip()
                 if text.startswith("Section:"):
-                    lines = text.splitlines()
-                    if len(lines) > 2:
-                        text = "\n".join(lines[2:]).strip()
+                    # drop the two header lines by slicing past the second newline
+                    p1 = text.find("\n")
+                    p2 = text.find("\n", p1 + 1) if p1 != -1 else -1
+                    if p2 != -1:
+                        text = text[p2 + 1:].strip()
                 out[key] = text
             else:
                 out[key] = ""
@@ -139,96 +198,74 @@ class AssemblyService:
         def repl(m: re.Match) -> str:
             inner = m.group(1)
             # keep [[p. X | Section: Y]] or [[p. X]]
-            if re.match(r"p\.\s*\d+(\s*\|\s*Section:\s*[\d\.]+)?", inner):
+            if _CIT_KEEP_RX.match(inner):
                 return f"[[{inner.strip()}]]"
-            pm = re.search(r"p\.\s*(\d+)", inner)
+            pm = _CIT_PAGE_RX.search(inner)
             return f"[[p. {pm.group(1)}]]" if pm else m.group(0)
-        return re.sub(r"\[\[(.*?)\]\]", repl, text or "")
+        return _CIT_RX.sub(repl, text or "")
 
     def _normalize_markdown_lists(self, text: str) -> str:
         """
         Make list markers conform to Markdown rules so Pandoc always recognizes them.
+
+        Single pass over the lines: canonicalize bullet/number markers, surround
+        each list block with a blank line, and collapse runs of blank lines.
         """
         if not text:
             return ""
-        text = text.replace(NBSP, " ").replace("\t", "    ")
-        lines = text.splitlines()
+        text = text.translate(_NORM_TBL)
 
-        norm: List[str] = []
-        bullet_rx = re.compile(r'^(\s*)([*\-•])\s+(.*)$')
-        number_rx = re.compile(r'^(\s*)(\d+)[\.\)]\s+(.*)$')
-        bullet_space_rx = re.compile(r'^(\s*)\*\s{2,}(.*)$')
-        number_space_rx = re.compile(r'^(\s*)(\d+)\.\s{2,}(.*)$')
-
-        for ln in lines:
-            m = bullet_rx.match(ln)
+        out: List[str] = []
+        in_list = False
+        for ln in text.splitlines():
+            is_list = False
+            m = _BULLET_RX.match(ln)
             if m:
                 indent, _mark, rest = m.groups()
                 ln = f"{indent}* {rest}"
+                is_list = bool(rest)
             else:
-                m2 = number_rx.match(ln)
-                if m2:
-                    indent, num, rest = m2.groups()
+                m = _NUMBER_RX.match(ln)
+                if m:
+                    indent, num, rest = m.groups()
                     ln = f"{indent}{num}. {rest}"
-            m3 = bullet_space_rx.match(ln)
-            if m3:
-                indent, rest = m3.groups()
-                ln = f"{indent}* {rest}"
-            m4 = number_space_rx.match(ln)
-            if m4:
-                indent, num, rest = m4.groups()
-                ln = f"{indent}{num}. {rest}"
-            norm.append(ln.rstrip())
-
-        def is_list_line(s: str) -> bool:
-            return bool(re.match(r'^\s*(\*|\d+\.)\s+\S', s))
-
-        result: List[str] = []
-        i = 0
-        while i < len(norm):
-            if is_list_line(norm[i]):
-                if result and result[-1].strip() != "":
-                    result.append("")
-                while i < len(norm) and is_list_line(norm[i]):
-                    result.append(norm[i])
-                    i += 1
-                if i < len(norm) and norm[i].strip() != "":
-                    result.append("")
-            else:
-                result.append(norm[i])
-                i += 1
-
-        cleaned: List[str] = []
-        for s in result:
-            if s.strip() == "":
-                if cleaned and cleaned[-1] == "":
-                    continue
-                cleaned.append("")
-            else:
-                cleaned.append(s)
+                    is_list = bool(rest)
+            ln = ln.rstrip()
+
+            if is_list:
+                # blank line before a list block
+                if not in_list and out and out[-1] != "":
+                    out.append("")
+            elif in_list and ln:
+                # blank line after a list block
+                out.append("")
+            in_list = is_list
 
-        return "\n".join(cleaned).strip()
+            if not ln and out and out[-1] == "":
+                continue
+            out.append(ln)
+
+        return "\n".join(out).strip()
 
     # ---------------------------
     # Public API
     # ---------------------------
+    def _render_digest(self, texts: Dict[str, str], reference_doc: Optional[str]) -> str:
+        """Fingerprint of everything that determines the DOCX bytes for a run."""
+        h = hashlib.blake2b(digest_size=16)
+        h.update(_SCAFFOLD_DIGEST)
+        h.update(self.cfg.DOCX_BACKEND.encode("utf-8"))
+        if reference_doc:
+            h.update(str(os.stat(reference_doc).st_mtime_ns).encode("ascii"))
+        for key in sorted(GEN_SECTIONS):
+            h.update(b"\0")
+            h.update((texts.get(key) or "").encode("utf-8"))
+        return h.hexdigest()
+
     def render_docx(self, run_id: str) -> str:
         # Load generated section texts
         texts = self._load_sections_text(run_id)
 
-        # Build Markdown mixing static template + generated sections
-        md_parts: List[str] = []
-        for heading, content in TEMPLATE_SECTIONS.items():
-            if content in GEN_SECTIONS:
-                raw = texts.get(content, "") or ""
-                raw = self._simplify_citations(raw)
-                body = self._normalize_markdown_lists(raw)
-            else:
-                body = content or ""
-            md_parts.append(f"## {heading}\n\n{body}\n")
-
-        full_md = "\n\n".join(md_parts).strip()
-
         # Output path prep
         meta = read_json(os.path.join(self._run_dir(run_id), "meta.json"), default={}) or {}
         file_id = meta.get("file_id") or "file"
@@ -239,18 +276,80 @@ class AssemblyService:
         out_dir = self._run_dir(run_id)
         ensure_dir(out_dir)
         out_path = os.path.join(out_dir, f"ICF_{base}.docx")
+        hash_path = out_path + ".hash"
 
-        # Pandoc conversion (reference_doc applies styles only)
-        extra_args: List[str] = []
-        if os.path.exists(self.reference_doc):
-            extra_args.append(f"--reference-doc={self.reference_doc}")
-
-        pypandoc.convert_text(
-            full_md,
-            "docx",
-            format="markdown+lists_without_preceding_blankline",
-            outputfile=out_path,
-            extra_args=extra_args,
-        )
+        # Unchanged inputs since the last render: reuse the existing file
+        reference_doc = self.reference_doc if os.path.exists(self.reference_doc) else None
+        digest = self._render_digest(texts, reference_doc)
+        if os.path.exists(out_path):
+            try:
+                with open(hash_path, "r", encoding="ascii") as fh:
+                    if fh.read().strip() == digest:
+                        return out_path
+            except OSError:
+                pass
+
+        # Build Markdown by splicing generated sections into the pre-rendered scaffold
+        md_parts: List[str] = []
+        for section, value in _SCAFFOLD:
+            if section is None:
+                md_parts.append(value)
+                continue
+            raw = texts.get(section, "") or ""
+            raw = self._simplify_citations(raw)
+            body = self._normalize_markdown_lists(raw)
+            md_parts.append(f"## {value}\n\n{body}\n")
+
+        full_md = "\n\n".join(md_parts).strip()
+
+        self._convert(full_md, out_path, reference_doc)
+        with open(hash_path, "w", encoding="ascii") as fh:
+            fh.write(digest)
 
         return out_path
+
+    def _convert(self, full_md: str, out_path: str, reference_doc: Optional[str]) -> None:
+        if self.cfg.DOCX_BACKEND != "pandoc":
+            try:
+                if write_markdown_docx(full_md, out_path, reference_doc):
+                    return
+            except Exception as e:
+                # e.g. a reference doc python-docx cannot read; pandoc is the fallback
+                log.warning("python-docx render failed, falling back to pandoc: %s", e)
+
+        if self.cfg.PANDOC_SERVER_PORT:
+            try:
+                self._convert_via_server(full_md, out_path, reference_doc)
+                return
+            except Exception as e:
+                log.warning("pandoc server unavailable, falling back to subprocess: %s", e)
+        self._convert_via_subprocess(full_md, out_path, reference_doc)
+
+    # ---------------------------
+    # Pandoc backends
+    # ---------------------------
+    def _convert_via_server(self, full_md: str, out_path: str, reference_doc: Optional[str]) -> None:
+        from app.services.pandoc_server import get_pandoc_server
+
+        server = get_pandoc_server(_pandoc_bin(), self.cfg.PANDOC_SERVER_PORT)
+        data = server.convert(full_md, PANDOC_FROM, "docx", reference_doc=reference_doc)
+        with open(out_path, "wb") as fh:
+            fh.write(data)
+
+    def _convert_via_subprocess(self, full_md: str, out_path: str, reference_doc: Optional[str]) -> None:
+        # Pandoc conversion (reference_doc applies styles only). Called directly
+        # rather than through pypandoc, which probes pandoc's format lists with
+        # two extra process spawns on every conversion.
+        cmd = [_pandoc_bin(), "-f", PANDOC_FROM, "-t", "docx", "-o", out_path]
+        if reference_doc:
+            cmd.append(f"--reference-doc={reference_doc}")
+
+        proc = subprocess.run(
+            cmd,
+            input=full_md.encode("utf-8"),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+        if proc.returncode != 0:
+            err = proc.stderr.decode("utf-8", errors="replace").strip()
+            raise RuntimeError(f"pandoc exited with {proc.returncode}: {err}")
@@ -8,16 +8,14 @@ Provides minimal but functional chains for:
 
 from __future__ import annotations
 
+import io
 import json
-import re
 from typing import Any, Dict, List, Optional
 import importlib
 import os
-from dotenv import load_dotenv
 
-from app.config import Config
-
-load_dotenv()  # This loads the .env file
+from app.config import AppConfig, Config
+from app.utils.text import loads_json_lenient
 
 from prompts.writer_common_template import (
     TEMPLATE_PURPOSE,
@@ -39,32 +37,59 @@ SECTION_TEMPLATES = {
     "benefits": TEMPLATE_BENEFITS,
 }
 
+# Writer system prompts keyed by lower-cased section; built once, read-only
+_WRITER_TPL: Dict[str, str] = {k.lower(): v for k, v in SECTION_TEMPLATES.items()}
+
+_WRITER_HUMAN_TMPL = (
+    "Write the {section} section.\n\nSnippets:\n{snippets}\n\nFacts (JSON):\n{facts_json}\n\n"
+    "Return only the section text with citations inline. REMEMBER, SECTION IN CITATION SHOULD NOT INCLUDE THE NAME...ONLY THE NUMBER FOR THE SECTION"
+)
+
+
+def _build_writer_prompts() -> Dict[str, Any]:
+    if ChatGoogleGenerativeAI is None:
+        return {}
+    return {
+        key: ChatPromptTemplate.from_messages([("system", tpl), ("human", _WRITER_HUMAN_TMPL)])
+        for key, tpl in _WRITER_TPL.items()
+    }
+
+
+# Writer ChatPromptTemplates, parsed once at import rather than per call
+_WRITER_PROMPTS: Dict[str, Any] = _build_writer_prompts()
+
 class LLMService:
-    def __init__(self, cfg: Config = Config):
+    def __init__(self, cfg: AppConfig = Config):
         self.cfg = cfg
         if ChatGoogleGenerativeAI is None:
             raise RuntimeError("langchain-google-genai is required. Install and set GOOGLE_API_KEY.")
         # Choose the model from config (default gemini-2.5-flash)
         self.model_name = getattr(cfg, "LLM_MODEL", "gemini-2.5-flash")
         self.llm = ChatGoogleGenerativeAI(model=self.model_name, temperature=0.2)
-        self._prompt_cache: Dict[str, str] = {}
+        # section -> composed `prompt | llm` runnable (bound to this instance's llm)
+        self._chain_cache: Dict[str, Any] = {}
 
     def _join_snippets(self, snippets: List[Dict[str, Any]], max_chars: int = 15000) -> str:
-        parts = []
+        # Stream blocks into one buffer; the cap (separators included) is checked
+        # from lengths before anything is written.
+        buf = io.StringIO()
         used = 0
         for s in snippets:
             header = f"[chunk_id={s['chunk_id']} page={s['page']} section={s['section_path']}]\n"
             body = s.get("text") or ""
-            block = header + body
-            if used + len(block) > max_chars:
+            size = len(header) + len(body) + (2 if used else 0)
+            if used + size > max_chars:
                 break
-            parts.append(block)
-            used += len(block)
-        return "\n\n".join(parts)
-
-    def extract_procedure_facts(self, snippets: List[Dict[str, Any]]) -> Dict[str, Any]:
+            if used:
+                buf.write("\n\n")
+            buf.write(header)
+            buf.write(body)
+            used += size
+        return buf.getvalue()
+
+    def _facts_prompt(self, snippets: List[Dict[str, Any]]) -> str:
         content = self._join_snippets(snippets)
-        prompt = (
+        return (
             "You are extracting structured facts about study procedures from the provided snippets.\n"
             "Use ONLY the text in the snippets. If a fact is absent, return null.\n"
             "Return strict JSON with keys: n_participants (int|null), duration (object|null) with {value:number, unit:'weeks|months|years'},\n"
@@ -72,13 +97,13 @@ class LLMService:
             "with per-field citations arrays containing objects {chunk_id, page}.\n\n"
             "Snippets:\n" + content + "\n\nReturn JSON only."
         )
-        resp = self.llm.invoke(prompt)
+
+    @staticmethod
+    def _parse_facts(resp: Any) -> Dict[str, Any]:
         text = resp.content if hasattr(resp, "content") else str(resp)
-        # Extract JSON from response
-        m = re.search(r"\{[\s\S]*\}$", text)
-        js = text if m is None else m.group(0)
+        # Usually pure JSON; otherwise take the first balanced {...} block
         try:
-            data = json.loads(js)
+            data = loads_json_lenient(text, "{")
         except Exception:
             data = {
                 "n_participants": None,
@@ -90,14 +115,29 @@ class LLMService:
             }
         return data
 
-    def _load_writer_template(self, section: str) -> str:
+    def extract_procedure_facts(self, snippets: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return self._parse_facts(self.llm.invoke(self._facts_prompt(snippets)))
+
+    async def aextract_procedure_facts(self, snippets: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return self._parse_facts(await self.llm.ainvoke(self._facts_prompt(snippets)))
+
+    def _writer_chain(self, section: str):
         key = section.lower()
-        if key in self._prompt_cache:
-            return self._prompt_cache[key]
-        txt = SECTION_TEMPLATES.get(key, TEMPLATE_PURPOSE)  # fallback to Purpose template
-        self._prompt_cache[key] = txt
-        return txt
+        chain = self._chain_cache.get(key)
+        if chain is None:
+            prompt = _WRITER_PROMPTS.get(key, _WRITER_PROMPTS["purpose"])  # fallback to Purpose
+            chain = self._chain_cache[key] = prompt | self.llm
+        return chain
 
+    def _writer_inputs(
+        self,
+        section: str,
+        snippets: List[Dict[str, Any]],
+        facts: Optional[Dict[str, Any]],
+    ) -> Dict[str, str]:
+        content = self._join_snippets(snippets)
+        facts_json = json.dumps(facts or {}, ensure_ascii=False)
+        return {"section": section, "snippets": content, "facts_json": facts_json}
 
     def write_section(
         self,
@@ -105,21 +145,16 @@ class LLMService:
         snippets: List[Dict[str, Any]],
         facts: Optional[Dict[str, Any]] = None,
     ) -> str:
-        content = self._join_snippets(snippets)
-        facts_json = json.dumps(facts or {}, ensure_ascii=False)
-        template = self._load_writer_template(section)
-
-        prompt = ChatPromptTemplate.from_messages(
-            [
-                ("system", template),
-                (
-                    "human",
-                    "Write the {section} section.\n\nSnippets:\n{snippets}\n\nFacts (JSON):\n{facts_json}\n\nReturn only the section text with citations inline. REMEMBER, SECTION IN CITATION SHOULD NOT INCLUDE THE NAME...ONLY THE NUMBER FOR THE SECTION",
-                ),
-            ]
-        )
-        chain = prompt | self.llm
-        result = chain.invoke({"section": section, "snippets": content, "facts_json": facts_json})
+        result = self._writer_chain(section).invoke(self._writer_inputs(section, snippets, facts))
+        return result.content if hasattr(result, "content") else str(result)
+
+    async def awrite_section(
+        self,
+        section: str,
+        snippets: List[Dict[str, Any]],
+        facts: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        result = await self._writer_chain(section).ainvoke(self._writer_inputs(section, snippets, facts))
         return result.content if hasattr(result, "content") else str(result)
 
     def self_check(self, section: str, text: str, snippets: List[Dict[str, Any]]) -> str:
@@ -0,0 +1,120 @@
+"""Long-lived ``pandoc server`` process for DOCX conversion.
+
+Every ``pandoc`` invocation pays the Haskell runtime startup and format-table
+load, which dominates for documents the size of an ICF. ``pandoc server``
+(pandoc >= 3.0) keeps one process warm and accepts JSON conversion requests
+over HTTP on localhost.
+
+Functions:
+- ``get_pandoc_server(pandoc_bin, port)``: returns the process-wide ``PandocServer``,
+  spawning ``pandoc server`` on first use.
+
+The server is opt-in (``PANDOC_SERVER_PORT`` > 0). Callers should fall back to
+a plain ``pandoc`` subprocess if it cannot be started or a request fails.
+"""
+
+from __future__ import annotations
+
+import atexit
+import base64
+import json
+import logging
+import subprocess
+import threading
+import time
+import urllib.request
+from typing import Dict, Optional
+
+log = logging.getLogger(__name__)
+
+_STARTUP_TIMEOUT_S = 10.0
+_REQUEST_TIMEOUT_S = 60.0
+
+
+class PandocServer:
+    """Owns one ``pandoc server`` child process bound to 127.0.0.1:<port>."""
+
+    def __init__(self, pandoc_bin: str, port: int):
+        self.pandoc_bin = pandoc_bin
+        self.port = port
+        self.url = f"http://127.0.0.1:{port}/"
+        self._proc: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+
+    def _ready(self) -> bool:
+        try:
+            with urllib.request.urlopen(self.url + "version", timeout=1.0) as resp:
+                return resp.status == 200
+        except Exception:
+            return False
+
+    def start(self) -> None:
+        """Spawn the server if it is not running and wait until it answers /version."""
+        with self._lock:
+            if self._proc is not None and self._proc.poll() is None:
+                return
+            self._proc = subprocess.Popen(
+                [self.pandoc_bin, "server", "--port", str(self.port)],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            deadline = time.monotonic() + _STARTUP_TIMEOUT_S
+            while time.monotonic() < deadline:
+                if self._proc.poll() is not None:
+                    break
+                if self._ready():
+                    log.info("pandoc server listening on port %s", self.port)
+                    return
+                time.sleep(0.1)
+            self._stop_locked()
+            raise RuntimeError(f"pandoc server did not start on port {self.port}")
+
+    def convert(self, text: str, from_fmt: str, to_fmt: str, reference_doc: Optional[str] = None) -> bytes:
+        """Convert ``text`` and return the output document bytes."""
+        self.start()
+        payload: Dict[str, object] = {"text": text, "from": from_fmt, "to": to_fmt, "standalone": True}
+        if reference_doc:
+            # The server has no filesystem access; supply the file inline
+            with open(reference_doc, "rb") as fh:
+                payload["files"] = {"reference.docx": base64.b64encode(fh.read()).decode("ascii")}
+            payload["reference-doc"] = "reference.docx"
+
+        req = urllib.request.Request(
+            self.url,
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json", "Accept": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(req, timeout=_REQUEST_TIMEOUT_S) as resp:
+            result = json.loads(resp.read())
+        if "error" in result:
+            raise RuntimeError(f"pandoc server error: {result['error']}")
+        output = result.get("output") or ""
+        return base64.b64decode(output) if result.get("base64") else output.encode("utf-8")
+
+    def _stop_locked(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is not None and proc.poll() is None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._stop_locked()
+
+
+_server: Optional[PandocServer] = None
+_server_lock = threading.Lock()
+
+
+def get_pandoc_server(pandoc_bin: str, port: int) -> PandocServer:
+    """Return the process-wide server, creating it (and its atexit hook) once."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = PandocServer(pandoc_bin, port)
+            atexit.register(_server.shutdown)
+        return _server
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import asyncio
+import heapq
 import json
 import os
-from typing import Any, Dict, List, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import weakref
+from functools import lru_cache
+from itertools import chain
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Sequence, Tuple
 
 from app.services.state_service import (
     run_dir,
@@ -15,7 +19,74 @@ from app.services.state_service import (
 from app.services.retrieval_service import RetrievalService
 from app.services.llm_service import LLMService
 from app.utils.io_utils import ensure_dir, read_json, write_json
-from app.services.section_queries import SECTION_QUERIES
+from app.utils.text import loads_json_lenient
+from app.services.section_queries import DEFAULT_SECTIONS, SECTION_QUERIES
+
+# Cap on concurrent sections in flight (LLM + retrieval calls per section)
+_MAX_CONCURRENT_SECTIONS = 8
+
+# Async LLM clients are bound to the event loop that created them, so each
+# asyncio.run() gets its own LLMService, shared by all of that run's tasks.
+_LOOP_LLMS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, LLMService]" = weakref.WeakKeyDictionary()
+
+
+def _llm() -> LLMService:
+    loop = asyncio.get_running_loop()
+    svc = _LOOP_LLMS.get(loop)
+    if svc is None:
+        svc = _LOOP_LLMS[loop] = LLMService()
+    return svc
+
+
+# Retrieval is synchronous (FAISS + embeddings over HTTP) and runs in worker
+# threads via asyncio.to_thread; one stateless instance serves all of them.
+@lru_cache(maxsize=1)
+def _retrieval() -> RetrievalService:
+    return RetrievalService()
+
+
+def _topk_dedupe(hits: Iterable[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+    """Collapse hits by chunk_id (summing scores) and return the top ``limit``.
+
+    A hit dict is copied only when its score changes, so callers' dicts are
+    never mutated.
+    """
+    by_id: Dict[str, Dict[str, Any]] = {}
+    copied = set()
+    for h in hits:
+        cid = h.get("chunk_id")
+        if not cid:
+            continue
+        prev = by_id.get(cid)
+        if prev is None:
+            by_id[cid] = h
+            continue
+        # combine scores conservatively
+        try:
+            score = float(prev.get("score", 0.0)) + float(h.get("score", 0.0))
+        except Exception:
+            continue
+        if cid not in copied:
+            prev = by_id[cid] = dict(prev)
+            copied.add(cid)
+        prev["score"] = score
+    return heapq.nlargest(limit, by_id.values(), key=lambda x: x.get("score", 0.0))
+
+
+async def _gather_sections(
+    func: Callable[[str], Awaitable[Any]],
+    sections: Sequence[str],
+    *,
+    return_exceptions: bool = False,
+) -> List[Any]:
+    """Run ``func(section)`` for every section concurrently, results in section order."""
+    sem = asyncio.Semaphore(_MAX_CONCURRENT_SECTIONS)
+
+    async def one(sec: str) -> Any:
+        async with sem:
+            return await func(sec)
+
+    return await asyncio.gather(*(one(s) for s in sections), return_exceptions=return_exceptions)
 
 
 class RefinementService:
@@ -28,7 +99,7 @@ class RefinementService:
     """
 
     def __init__(self):
-        # Don't initialize services here - create per-thread to avoid contention
+        # Services are shared per event loop / per process (see _llm/_retrieval)
         pass
 
     def _read_run_meta(self, rdir: str) -> Dict[str, Any]:
@@ -42,10 +113,9 @@ class RefinementService:
         items = read_json(os.path.join(rdir, "snippets", f"{name}.json"), default=[]) or []
         return items if isinstance(items, list) else []
 
-    def _propose_section_queries(self, section: str, text: str, max_queries: int = 3) -> List[str]:
-        # Create per-thread LLM service to avoid shared state issues
-        lsvc = LLMService()
-        
+    async def _propose_section_queries(self, section: str, text: str, max_queries: int = 3) -> List[str]:
+        lsvc = _llm()
+
         prompt = (
             "You are reviewing a drafted Informed Consent Form (ICF) section.\n"
             "Identify important missing information needed for this section, and propose up to 3 broad,\n"
@@ -54,12 +124,10 @@ class RefinementService:
             f"Section: {section}\n\nText to review:\n{text}\n\nJSON array only:"
         )
         try:
-            resp = lsvc.llm.invoke(prompt)
+            resp = await lsvc.llm.ainvoke(prompt)
             content = getattr(resp, "content", str(resp))
             # Extract JSON array
-            import re, json as _json
-            m = re.search(r"\[[\s\S]*\]", content)
-            arr = _json.loads(m.group(0) if m else content)
+            arr = loads_json_lenient(content, "[")
             if isinstance(arr, list):
                 arr = [str(q).strip() for q in arr if str(q).strip()]
                 return arr[: max_queries]
@@ -68,50 +136,33 @@ class RefinementService:
         return []
 
     def _merge_hits(self, base: List[Dict[str, Any]], extra: List[Dict[str, Any]], limit: int = 16) -> List[Dict[str, Any]]:
-        by_id: Dict[str, Dict[str, Any]] = {}
-        for h in base + extra:
-            cid = h.get("chunk_id")
-            if not cid:
-                continue
-            if cid not in by_id:
-                by_id[cid] = dict(h)
-            else:
-                # combine scores conservatively
-                try:
-                    by_id[cid]["score"] = float(by_id[cid].get("score", 0.0)) + float(h.get("score", 0.0))
-                except Exception:
-                    pass
-        merged = sorted(by_id.values(), key=lambda x: x.get("score", 0.0), reverse=True)
-        return merged[:limit]
-
-    def _refine_section(self, run_id: str, index_id: str, section: str, rdir: str) -> Tuple[str, Dict[str, Any]]:
-        """Refine a single section - designed to run in parallel."""
-        # Create per-thread services to avoid shared-state contention
-        rsvc = RetrievalService()
-        lsvc = LLMService()
-        
+        return _topk_dedupe(chain(base, extra), limit)
+
+    async def _refine_section(self, run_id: str, index_id: str, section: str, rdir: str) -> Tuple[str, Dict[str, Any]]:
+        """Refine a single section - designed to run concurrently with the others."""
+        rsvc = _retrieval()
+        lsvc = _llm()
+
         current_text = self._read_section_text(rdir, section)
         orig_hits = self._read_original_hits(rdir, section)
 
         # Ask for follow-up queries
-        qs = self._propose_section_queries(section, current_text, max_queries=3)
+        qs = await self._propose_section_queries(section, current_text, max_queries=3)
         print(f"[RUN {run_id}] [Refine:{section}] Proposed queries: {qs}")
 
-        # Retrieve additional hits per query
+        # Retrieve additional hits for all queries in one batched call
         extra_hits: List[Dict[str, Any]] = []
-        for q in qs:
-            try:
-                extra_hits.extend(
-                    rsvc.search(index_id=index_id, query=q, section=None, mode="dense")
-                )
-            except Exception as e:
-                # ignore retrieval errors for individual queries
-                print(f"[RUN {run_id}] [Refine:{section}] Retrieval error for '{q}': {e}")
+        try:
+            results = await asyncio.to_thread(rsvc.search_batch, index_id, qs, section=None, mode="dense")
+            extra_hits = list(chain.from_iterable(results))
+        except Exception as e:
+            # refine with the original snippets only
+            print(f"[RUN {run_id}] [Refine:{section}] Retrieval error for {qs}: {e}")
 
         # Merge and rewrite
         combined = self._merge_hits(orig_hits, extra_hits, limit=18)
-        facts = lsvc.extract_procedure_facts(combined) if section == "Procedures" else None
-        draft = lsvc.write_section(section, combined, facts)
+        facts = await lsvc.aextract_procedure_facts(combined) if section == "Procedures" else None
+        draft = await lsvc.awrite_section(section, combined, facts)
         final = lsvc.self_check(section, draft, combined)
         print(f"[RUN {run_id}] [Refine:{section}] Combined hits: {len(combined)}")
 
@@ -145,35 +196,30 @@ class RefinementService:
         ref_dir = os.path.join(rdir, "refinement")
         ensure_dir(ref_dir)
 
-        # Get all sections to refine
-        sections = []
-        for fname in sorted(os.listdir(sections_dir)):
-            if fname.endswith(".json"):
-                sections.append(os.path.splitext(fname)[0])
+        # Get all sections to refine (sorted for a deterministic order)
+        with os.scandir(sections_dir) as it:
+            sections = sorted(e.name[:-5] for e in it if e.name.endswith(".json") and e.is_file())
 
         print(f"[RUN {run_id}] Starting parallel refinement for sections: {sections}")
 
-        # Parallel refinement with ThreadPoolExecutor
+        # All sections run concurrently on one event loop
+        results = asyncio.run(
+            _gather_sections(
+                lambda sec: self._refine_section(run_id, index_id, sec, rdir),
+                sections,
+                return_exceptions=True,
+            )
+        )
         updated: Dict[str, Any] = {}
         queries_log: Dict[str, Any] = {}
-        
-        # Use ThreadPoolExecutor like in your generate route
-        with ThreadPoolExecutor(max_workers=min(4, len(sections))) as executor:
-            # Submit all section refinement tasks
-            futures = [
-                executor.submit(self._refine_section, run_id, index_id, sec, rdir) 
-                for sec in sections
-            ]
-            
-            # Collect results as they complete
-            for future in as_completed(futures):
-                try:
-                    section, result = future.result()
-                    updated[section] = {"text": result["text"]}
-                    queries_log[section] = result["queries"]
-                except Exception as e:
-                    print(f"[RUN {run_id}] Error refining section: {e}")
-                    # Continue with other sections even if one fails
+        for res in results:
+            if isinstance(res, BaseException):
+                print(f"[RUN {run_id}] Error refining section: {res}")
+                # Continue with other sections even if one fails
+                continue
+            section, result = res
+            updated[section] = {"text": result["text"]}
+            queries_log[section] = result["queries"]
 
         # Save refinement queries log
         write_json(os.path.join(ref_dir, "queries.json"), queries_log)
@@ -183,12 +229,12 @@ class RefinementService:
         
         return {"run_id": run_id, "status": "refined", "sections": updated, "queries": queries_log}
 
-    def generate_then_refine(self, file_id: str, sections: List[str] | None = None, *, mode: str = "dense", use_section_filter: bool = False) -> Dict[str, Any]:
+    def generate_then_refine(self, file_id: str, sections: Sequence[str] | None = None, *, mode: str = "dense", use_section_filter: bool = False) -> Dict[str, Any]:
         """Run the normal generate pipeline first, then refine the same run, returning final refined sections.
 
         Mirrors the logic in the generate route to avoid HTTP round-trips, then calls refine_run.
         """
-        sections = sections or ["Purpose", "Procedures", "Risks", "Benefits"]
+        sections = sections or DEFAULT_SECTIONS
 
         index_id = get_latest_index_for_file(file_id)
         if not index_id:
@@ -197,25 +243,19 @@ class RefinementService:
         run_id = create_run(file_id, index_id)
         print(f"[RUN {run_id}] Starting generate_then_refine for sections: {sections}")
 
-        from concurrent.futures import ThreadPoolExecutor, as_completed
-
-        def run_section(sec: str):
-            rsvc = RetrievalService()
-            lsvc = LLMService()
+        # Retrieval for every section up front: one embedding request, then
+        # the sections' searches run concurrently
+        section_queries = {}
+        for sec in sections:
             queries = SECTION_QUERIES.get(sec, [])
-            if isinstance(queries, str):
-                queries = [queries]
-            section_arg = sec if use_section_filter else None
-            all_hits: Dict[str, Any] = {}
-            for q in queries:
-                results_list = rsvc.search(index_id=index_id, query=q, section=section_arg, mode=mode)
-                for r in results_list:
-                    cid = r["chunk_id"]
-                    if cid not in all_hits:
-                        all_hits[cid] = r
-                    else:
-                        all_hits[cid]["score"] += r["score"]
-            hits = sorted(all_hits.values(), key=lambda x: x["score"], reverse=True)[:12]
+            section_queries[sec] = [queries] if isinstance(queries, str) else queries
+        per_section = _retrieval().search_sections(
+            index_id, section_queries, mode=mode, use_section_filter=use_section_filter
+        )
+
+        async def run_section(sec: str):
+            lsvc = _llm()
+            hits = _topk_dedupe(chain.from_iterable(per_section[sec]), 12)
             for rank, h in enumerate(hits, start=1):
                 try:
                     print(
@@ -224,8 +264,8 @@ class RefinementService:
                     )
                 except Exception:
                     pass
-            facts = lsvc.extract_procedure_facts(hits) if sec == "Procedures" else None
-            draft = lsvc.write_section(sec, hits, facts)
+            facts = await lsvc.aextract_procedure_facts(hits) if sec == "Procedures" else None
+            draft = await lsvc.awrite_section(sec, hits, facts)
             final = lsvc.self_check(sec, draft, hits)
             write_section_artifacts(
                 run_id,
@@ -237,10 +277,7 @@ class RefinementService:
                 facts=facts,
             )
 
-        with ThreadPoolExecutor(max_workers=min(4, len(sections))) as ex:
-            futs = [ex.submit(run_section, s) for s in sections]
-            for f in as_completed(futs):
-                _ = f.result()
+        asyncio.run(_gather_sections(run_section, sections))
 
         finalize_run(run_id, status="succeeded")
         print(f"[RUN {run_id}] Generation complete; starting refinement")
@@ -7,13 +7,23 @@ section, fuses sparse and dense scores, and returns top snippets.
 
 from __future__ import annotations
 
+import heapq
 import os
-from typing import Any, Dict, List, Optional, Tuple
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
 
-from app.config import Config
+from app.config import AppConfig, Config
+from app.services.section_queries import SECTION_QUERIES
 from app.utils.bm25 import bm25_top_k, load_bm25
+from app.utils.embed_cache import load_embeddings, save_embeddings
 from app.utils.io_utils import read_json
 from app.utils.langchain_processing import count_tokens
+from app.utils.text_store import open_text_store
 
 
 SECTION_ALLOWED_HEADINGS = {
@@ -32,9 +42,171 @@ SECTION_ALLOWED_HEADINGS = {
     "Benefits": ["benefits", "potential benefits"],
 }
 
+# Shared read-only stand-in for missing Document metadata
+_EMPTY_MD: Mapping[str, Any] = MappingProxyType({})
+
+# Per-section matchers for _allowed_heading: a regex alternation answers
+# "some allowed phrase occurs in the heading", and a NUL-joined string answers
+# "the heading occurs in some allowed phrase" with a single substring scan.
+_SECTION_HEADING_RX = {
+    sec: re.compile("|".join(map(re.escape, sorted(words, key=len, reverse=True))))
+    for sec, words in SECTION_ALLOWED_HEADINGS.items()
+}
+_SECTION_HEADING_JOINED = {sec: "\0".join(words) for sec, words in SECTION_ALLOWED_HEADINGS.items()}
+
+
+# Static section-template queries; embedded together with the first cache miss
+_TEMPLATE_QUERIES: Tuple[str, ...] = tuple(
+    dict.fromkeys(q for qs in SECTION_QUERIES.values() for q in ([qs] if isinstance(qs, str) else qs))
+)
+# Only these are persisted to the on-disk embedding cache; ad-hoc queries stay
+# in the capped in-memory dict so the disk cache cannot grow without bound
+_TEMPLATE_QUERY_SET = frozenset(_TEMPLATE_QUERIES)
+
+# (embed model, query text) -> query embedding, shared across instances/threads.
+# Ad-hoc queries (e.g. refinement follow-ups) are only added below the cap.
+_QUERY_VECS: Dict[Tuple[str, str], List[float]] = {}
+_QUERY_VECS_MAX = 2048
+_QUERY_VECS_LOCK = threading.Lock()
+
+# Shared by search_sections: one worker per ICF section; created on first use
+_SECTION_POOL: Optional[ThreadPoolExecutor] = None
+_SECTION_POOL_LOCK = threading.Lock()
+
+
+def _section_pool() -> ThreadPoolExecutor:
+    global _SECTION_POOL
+    with _SECTION_POOL_LOCK:
+        if _SECTION_POOL is None:
+            _SECTION_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="retrieval")
+        return _SECTION_POOL
+
+
+# faiss.METRIC_INNER_PRODUCT, without importing faiss at module load
+_METRIC_INNER_PRODUCT = 0
+
+
+def _cosine_relevance(score: float) -> float:
+    return min(max(score, 0.0), 1.0)
+
+
+@lru_cache(maxsize=8)
+def _load_faiss_cached(
+    fdir: str, embed_model: str, stamp: int, ef_search: int = 64, nprobe: int = 16, gpu_min_vectors: int = 0
+):
+    """Load a FAISS store (and its embeddings client) once per index build.
+
+    ``stamp`` is the mtime of ``index.faiss``; it is only part of the key, so a
+    rebuilt index is picked up without explicit invalidation. ``ef_search`` and
+    ``nprobe`` apply to HNSW / IVF indexes built at ingest; flat indexes ignore them.
+    Stores of at least ``gpu_min_vectors`` vectors are moved to GPU when available.
+    """
+    try:
+        from langchain_community.vectorstores import FAISS
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+    except Exception as e:  # pragma: no cover
+        raise RuntimeError("Missing langchain-community or langchain-google-genai") from e
+
+    embeddings = GoogleGenerativeAIEmbeddings(model=embed_model)
+    # allow_dangerous_deserialization is required for FAISS load_local
+    vs = FAISS.load_local(fdir, embeddings=embeddings, index_name="index", allow_dangerous_deserialization=True)
+    if vs.index.metric_type == _METRIC_INNER_PRODUCT:
+        # Inner-product stores are built from L2-normalized vectors (cosine);
+        # the pickle does not record that, so restore it for query-time
+        # normalization and scoring
+        from langchain_community.vectorstores.utils import DistanceStrategy
+
+        vs.distance_strategy = DistanceStrategy.MAX_INNER_PRODUCT
+        vs._normalize_L2 = True
+        vs.override_relevance_score_fn = _cosine_relevance
+    _tune_faiss_index(vs.index, ef_search, nprobe)
+    vs.index = _maybe_to_gpu(vs.index, gpu_min_vectors)
+    return vs
+
+
+def _maybe_to_gpu(index: Any, min_vectors: int) -> Any:
+    """Copy ``index`` to all visible GPUs if it is large enough; otherwise return it unchanged.
+
+    Needs faiss-gpu. Index types without a GPU implementation (e.g. HNSW), or
+    without the ``reconstruct`` that MMR search relies on, stay on CPU.
+    """
+    if min_vectors <= 0 or index.ntotal < min_vectors:
+        return index
+    try:
+        import faiss
+
+        if not hasattr(faiss, "get_num_gpus") or faiss.get_num_gpus() <= 0:
+            return index
+        gpu_index = faiss.index_cpu_to_all_gpus(index)
+        gpu_index.reconstruct(0)
+    except Exception:
+        return index
+    return gpu_index
+
+
+def _tune_faiss_index(index: Any, ef_search: int, nprobe: int) -> None:
+    hnsw = getattr(index, "hnsw", None)
+    if hnsw is not None:
+        hnsw.efSearch = ef_search
+    if hasattr(index, "nprobe"):
+        index.nprobe = nprobe
+        return
+    try:
+        import faiss
+
+        faiss.extract_index_ivf(index).nprobe = nprobe
+    except Exception:
+        pass
+
+
+@dataclass(frozen=True)
+class IndexTables:
+    """Per-index chunk metadata as parallel lists (position = BM25 doc index).
+
+    Holds the chunks that were embedded/indexed, i.e. chunks.json minus the
+    empty-text chunks skipped at build time, in chunks.json order. That is also
+    FAISS row order, so chunk text is not duplicated here; it is read by row
+    (text store or, for older indexes, the docstore) for the final results only.
+    """
+
+    chunk_ids: List[str]
+    headings_norm: List[str]
+    section_paths: List[Optional[str]]
+    pages: List[int]
+    # Token count per chunk from ingest; -1 for indexes built before it was stored
+    n_tokens: List[int]
+    cid_to_idx: Dict[str, int]
+
+
+@lru_cache(maxsize=8)
+def _load_index_tables_cached(index_dir: str, stamp: int) -> IndexTables:
+    # stamp (chunks.json mtime) is part of the key only
+    chunks = read_json(os.path.join(index_dir, "chunks.json"), default=[]) or []
+    chunk_ids: List[str] = []
+    headings: List[str] = []
+    section_paths: List[Optional[str]] = []
+    pages: List[int] = []
+    n_tokens: List[int] = []
+    for ch in chunks:
+        if not (ch.get("text") or "").strip():
+            continue
+        chunk_ids.append(ch.get("chunk_id"))
+        headings.append((ch.get("heading_norm") or "").lower())
+        section_paths.append(ch.get("section_path"))
+        pages.append(int((ch.get("page_span") or [1, 1])[0]))
+        n_tokens.append(int(ch.get("n_tokens", -1)))
+    return IndexTables(
+        chunk_ids=chunk_ids,
+        headings_norm=headings,
+        section_paths=section_paths,
+        pages=pages,
+        n_tokens=n_tokens,
+        cid_to_idx={cid: i for i, cid in enumerate(chunk_ids)},
+    )
+
 
 class RetrievalService:
-    def __init__(self, cfg: Config = Config):
+    def __init__(self, cfg: AppConfig = Config):
         self.cfg = cfg
 
     def _index_dir(self, index_id: str) -> str:
@@ -47,55 +219,37 @@ class RetrievalService:
         return os.path.join(self._index_dir(index_id), "bm25.json")
 
     def _load_faiss(self, index_id: str):
-        try:
-            from langchain_community.vectorstores import FAISS
-            from langchain_google_genai import GoogleGenerativeAIEmbeddings
-        except Exception as e:  # pragma: no cover
-            raise RuntimeError("Missing langchain-community or langchain-google-genai") from e
-
-        embeddings = GoogleGenerativeAIEmbeddings(model=self.cfg.EMBED_MODEL)
+        """Return the (process-cached) FAISS store for an index."""
         fdir = self._faiss_dir(index_id)
         if not os.path.isdir(fdir):
             raise FileNotFoundError("FAISS index folder not found; re-run ingest to index.")
-        # allow_dangerous_deserialization is required for FAISS load_local
-        vs = FAISS.load_local(fdir, embeddings=embeddings, index_name="index", allow_dangerous_deserialization=True)
-        return vs
-
-    def _load_docs_in_order(self, index_id: str, vs) -> List[Any]:
-        """Return documents in the same order as chunks.json.
+        try:
+            stamp = os.stat(os.path.join(fdir, "index.faiss")).st_mtime_ns
+        except OSError:
+            stamp = 0
+        cfg = self.cfg
+        return _load_faiss_cached(
+            fdir, cfg.EMBED_MODEL, stamp, cfg.FAISS_EF_SEARCH, cfg.FAISS_NPROBE, cfg.FAISS_GPU_MIN_VECTORS
+        )
 
-        We map chunk_id from chunks.json to documents in FAISS docstore by metadata.
-        """
-        chunks = read_json(os.path.join(self._index_dir(index_id), "chunks.json"), default=[]) or []
-        # Build mapping from chunk_id to Document from FAISS docstore
-        # FAISS docstore stores a dict of id->Document
-        doc_by_chunk: Dict[str, Any] = {}
+    def _load_index_tables(self, index_id: str) -> IndexTables:
+        """Return the (process-cached) chunk metadata tables for an index."""
+        idir = self._index_dir(index_id)
         try:
-            # Newer LC
-            values = vs.docstore._dict.values()
-        except Exception:
-            values = []
-        for d in values:
-            cid = (d.metadata or {}).get("chunk_id")
-            if cid:
-                doc_by_chunk[cid] = d
-        ordered_docs: List[Any] = []
-        for ch in chunks:
-            cid = ch.get("chunk_id")
-            d = doc_by_chunk.get(cid)
-            if d is not None:
-                ordered_docs.append(d)
-        return ordered_docs
+            stamp = os.stat(os.path.join(idir, "chunks.json")).st_mtime_ns
+        except OSError:
+            stamp = 0
+        return _load_index_tables_cached(idir, stamp)
 
     @staticmethod
-    def _normalize_scores(pairs: List[Tuple[int, float]]) -> Dict[int, float]:
-        if not pairs:
-            return {}
-        vals = [s for _, s in pairs]
-        lo, hi = min(vals), max(vals)
-        if hi - lo <= 1e-9:
-            return {i: 1.0 for i, _ in pairs}
-        return {i: (s - lo) / (hi - lo) for i, s in pairs}
+    def invalidate(index_id: Optional[str] = None) -> None:
+        """Drop cached vectorstores/index tables (call after (re)building an index).
+
+        ``functools.lru_cache`` cannot evict a single key, so this clears all
+        entries; ``index_id`` is accepted for call-site clarity.
+        """
+        _load_faiss_cached.cache_clear()
+        _load_index_tables_cached.cache_clear()
 
     def _allowed_heading(self, section, heading_norm: str) -> bool:
         if not section:
@@ -103,11 +257,69 @@ class RetrievalService:
         hn = (heading_norm or "").strip().lower()
         if not hn:
             return True
-        allowed = SECTION_ALLOWED_HEADINGS.get(section, [])
-        return any(a in hn or hn in a for a in allowed)
+        rx = _SECTION_HEADING_RX.get(section)
+        if rx is None:
+            return False
+        return rx.search(hn) is not None or hn in _SECTION_HEADING_JOINED[section]
+
 
+    def _chunk_text(self, vs, index_id: str, pos: int, chunk_id: str) -> str:
+        """Text of the chunk at FAISS row ``pos`` (falls back to a docstore scan by id).
 
-    def _trim_text(self, text: str, max_tokens: int = 300) -> str:
+        Indexes built with a text store keep an empty ``page_content`` in the
+        docstore; the text is then read from the memory-mapped store by row.
+        """
+        id_map = vs.index_to_docstore_id
+        doc = vs.docstore.search(id_map.get(pos))
+        md = getattr(doc, "metadata", None) or {}
+        if md.get("chunk_id") != chunk_id:
+            # chunks.json and the FAISS store are out of step; look the chunk up by id
+            pos, doc = next(
+                (
+                    (row, d)
+                    for row, d in ((row, vs.docstore.search(did)) for row, did in id_map.items())
+                    if (getattr(d, "metadata", None) or {}).get("chunk_id") == chunk_id
+                ),
+                (-1, None),
+            )
+        text = getattr(doc, "page_content", None) or ""
+        if text or doc is None:
+            return text
+        store = open_text_store(self._faiss_dir(index_id))
+        return store.get(pos) if store is not None else ""
+
+    def _doc_text(self, vs, index_id: str, doc) -> str:
+        """Text for a Document returned by LangChain search (see ``_chunk_text``)."""
+        if doc.page_content:
+            return doc.page_content
+        cid = (doc.metadata or _EMPTY_MD).get("chunk_id")
+        pos = self._load_index_tables(index_id).cid_to_idx.get(cid)
+        return self._chunk_text(vs, index_id, pos, cid) if pos is not None else ""
+
+    def _trim_text(
+        self, text: str, max_tokens: int = 300, precise: bool = False, n_tokens_hint: Optional[int] = None
+    ) -> str:
+        # Token count stored at ingest: chunks under the cap need no tokenizer pass
+        if n_tokens_hint is not None and 0 <= n_tokens_hint <= max_tokens:
+            return text
+        if not precise:
+            if n_tokens_hint is not None:
+                # Known to be over the cap: cut in proportion to the stored count
+                est_chars = int(len(text) * max_tokens / n_tokens_hint)
+            else:
+                # ~4 chars per token for English prose
+                est_chars = max_tokens * 4
+                if len(text) <= est_chars * 1.1:
+                    return text
+            # Slice at a word boundary and verify with a tokenizer pass; re-chop
+            # (and re-verify) a few times before the exact word-level search
+            cut = text[:est_chars].rsplit(" ", 1)[0]
+            for _ in range(3):
+                n_tokens = count_tokens(cut)
+                if n_tokens <= max_tokens:
+                    return cut
+                cut = cut[: int(len(cut) * max_tokens / n_tokens * 0.9)].rsplit(" ", 1)[0]
+            text = cut
         # Simple token-based trim
         if count_tokens(text) <= max_tokens:
             return text
@@ -142,14 +354,232 @@ class RetrievalService:
         k_final: int = 12,
         w_sparse: float = 0.6,
         w_dense: float = 0.4,
+        k_rrf: int = 60,
     ) -> List[Dict[str, Any]]:
         """Run hybrid retrieval and return final snippets.
 
         Returns list of snippets with fields: chunk_id, page, section_path,
         heading_norm, text, score, source_scores.
         """
+        return self.search_batch(
+            index_id,
+            [query],
+            section=section,
+            mode=mode,
+            k_dense=k_dense,
+            search_type=search_type,
+            search_kwargs=search_kwargs,
+            k_sparse=k_sparse,
+            k_final=k_final,
+            w_sparse=w_sparse,
+            w_dense=w_dense,
+            k_rrf=k_rrf,
+        )[0]
+
+    def search_batch(
+        self,
+        index_id: str,
+        queries: Sequence[str],
+        section: Optional[str] = None,
+        mode: str = "dense",
+        **kwargs: Any,
+    ) -> List[List[Dict[str, Any]]]:
+        """Run several queries against one index; returns one result list per query.
+
+        The index is loaded once and query embeddings come from the
+        process-wide cache, with all misses fetched in a single batched
+        embedding request. In hybrid mode the dense candidates for every query
+        come from one stacked ``index.search`` call. Accepts the same keyword
+        settings as ``search``.
+        """
+        if not queries:
+            return []
         vs = self._load_faiss(index_id)
+        vecs = self._embed_queries(vs, queries)
+        dense_hits: List[Optional[List[Tuple[str, float]]]] = [None] * len(queries)
+        if mode != "dense":
+            tables = self._load_index_tables(index_id)
+            dense_hits = self._dense_hits_batch(vs, vecs, int(kwargs.get("k_dense", 12)), tables.chunk_ids)
+        return [
+            self._search_loaded(vs, index_id, q, section=section, mode=mode, query_vec=v, dense_hits=h, **kwargs)
+            for q, v, h in zip(queries, vecs, dense_hits)
+        ]
+
+    def search_multi(
+        self,
+        index_id: str,
+        queries: Sequence[str],
+        section: Optional[str] = None,
+        mode: str = "dense",
+        k_final: int = 12,
+        k_rrf: int = 60,
+        **kwargs: Any,
+    ) -> List[Dict[str, Any]]:
+        """Retrieve with several query variants and fuse them into one ranked list.
+
+        Duplicate query strings are searched once. Per-query rankings are
+        combined with Reciprocal Rank Fusion (1 / (k_rrf + rank), summed over
+        queries); ``score`` on the returned snippets is the fused score.
+        """
+        uniq = list(dict.fromkeys(queries))
+        per_query = self.search_batch(index_id, uniq, section=section, mode=mode, k_final=k_final, k_rrf=k_rrf, **kwargs)
+        fused: Dict[str, float] = {}
+        first: Dict[str, Dict[str, Any]] = {}
+        for hits in per_query:
+            for rank, h in enumerate(hits, start=1):
+                cid = h["chunk_id"]
+                fused[cid] = fused.get(cid, 0.0) + 1.0 / (k_rrf + rank)
+                first.setdefault(cid, h)
+        # Ties keep first-seen order (dict order), so results are deterministic
+        top = heapq.nlargest(k_final, fused, key=fused.__getitem__)
+        return [dict(first[cid], score=fused[cid]) for cid in top]
+
+    def search_sections(
+        self,
+        index_id: str,
+        section_queries: Mapping[str, Sequence[str]],
+        mode: str = "dense",
+        use_section_filter: bool = False,
+        **kwargs: Any,
+    ) -> Dict[str, List[List[Dict[str, Any]]]]:
+        """``search_batch`` for several sections at once; returns section -> per-query results.
+
+        All query embeddings are fetched up front in one request, then the
+        sections run concurrently on a shared thread pool (FAISS releases the
+        GIL during search). With ``use_section_filter`` each section's results
+        are restricted to its allowed headings.
+        """
+        vs = self._load_faiss(index_id)
+        self._embed_queries(vs, [q for qs in section_queries.values() for q in qs])
+        futures = {
+            sec: _section_pool().submit(
+                self.search_batch, index_id, qs, sec if use_section_filter else None, mode, **kwargs
+            )
+            for sec, qs in section_queries.items()
+        }
+        return {sec: fut.result() for sec, fut in futures.items()}
+
+    def _embed_queries(self, vs, queries: Sequence[str]) -> List[Optional[List[float]]]:
+        model = self.cfg.EMBED_MODEL
+        with _QUERY_VECS_LOCK:
+            found = {q: _QUERY_VECS.get((model, q)) for q in queries}
+            missing = [q for q, v in found.items() if v is None]
+            if missing:
+                # Template queries repeat on every run; warm them in the same request
+                missing += [q for q in _TEMPLATE_QUERIES if (model, q) not in _QUERY_VECS and q not in found]
+
+        if missing:
+            # Disk cache next: fixed section queries survive restarts
+            on_disk = load_embeddings(
+                self.cfg.EMBED_CACHE_DIR, model, [q for q in missing if q in _TEMPLATE_QUERY_SET]
+            )
+            if on_disk:
+                with _QUERY_VECS_LOCK:
+                    for q, v in on_disk.items():
+                        if len(_QUERY_VECS) < _QUERY_VECS_MAX or q in _TEMPLATE_QUERY_SET:
+                            _QUERY_VECS[(model, q)] = v
+                found.update(on_disk)
+                missing = [q for q in missing if q not in on_disk]
+
+        if missing:
+            emb = getattr(vs, "embedding_function", None)
+            try:
+                # One request for all misses; the query task type yields the
+                # same vectors as embed_query()
+                vecs = emb.embed_documents(missing, task_type="RETRIEVAL_QUERY")
+            except Exception:
+                # Unbatched fallback: each query is embedded by the normal search path
+                vecs = []
+            if len(vecs) == len(missing):
+                with _QUERY_VECS_LOCK:
+                    for q, v in zip(missing, vecs):
+                        if len(_QUERY_VECS) < _QUERY_VECS_MAX or q in _TEMPLATE_QUERY_SET:
+                            _QUERY_VECS[(model, q)] = v
+                found.update(zip(missing, vecs))
+                save_embeddings(
+                    self.cfg.EMBED_CACHE_DIR,
+                    model,
+                    [(q, v) for q, v in zip(missing, vecs) if q in _TEMPLATE_QUERY_SET],
+                )
+        return [found.get(q) for q in queries]
+
+    @staticmethod
+    def _dense_hits_batch(
+        vs, vecs: Sequence[Optional[List[float]]], k: int, chunk_ids: Optional[Sequence[str]] = None
+    ) -> List[Optional[List[Tuple[str, float]]]]:
+        """Top-``k`` (chunk_id, relevance) per query vector from a single FAISS call.
 
+        Cosine (normalized inner-product) stores report the similarity itself,
+        clipped to [0, 1]; other stores use the score function behind
+        ``similarity_search_with_relevance_scores``. ``chunk_ids`` (FAISS row
+        order) maps rows to chunks without docstore lookups when it covers the
+        whole index. Entries are None where no vector is available or the raw
+        index cannot be used, so the caller falls back to the per-query
+        LangChain path.
+        """
+        out: List[Optional[List[Tuple[str, float]]]] = [None] * len(vecs)
+        rows = [i for i, v in enumerate(vecs) if v is not None]
+        if not rows:
+            return out
+        try:
+            import numpy as np
+
+            xq = np.asarray([vecs[i] for i in rows], dtype=np.float32)
+            if getattr(vs, "_normalize_L2", False):
+                import faiss
+
+                faiss.normalize_L2(xq)
+            D, I = vs.index.search(xq, k)
+            if vs.index.metric_type == _METRIC_INNER_PRODUCT and getattr(vs, "_normalize_L2", False):
+                D = np.clip(D, 0.0, 1.0)
+            else:
+                relevance = vs._select_relevance_score_fn()
+                D = [[relevance(float(dist)) for dist in row_d] for row_d in D]
+        except Exception:
+            return out
+        by_row = chunk_ids if chunk_ids is not None and len(chunk_ids) == vs.index.ntotal else None
+        id_map = vs.index_to_docstore_id
+        for r, row in enumerate(rows):
+            hits: List[Tuple[str, float]] = []
+            for score, j in zip(D[r], I[r]):
+                if j == -1:
+                    continue
+                if by_row is not None:
+                    cid = by_row[j]
+                else:
+                    doc = vs.docstore.search(id_map[int(j)])
+                    cid = (getattr(doc, "metadata", None) or _EMPTY_MD).get("chunk_id")
+                hits.append((cid, float(score)))
+            out[row] = hits
+        return out
+
+    @staticmethod
+    def _dense_docs_by_vector(vs, vec: List[float], search_type: str, skw: Dict[str, Any]) -> Optional[List[Any]]:
+        """Vector-input equivalent of ``vs.as_retriever(...).invoke(query)``; None if unsupported."""
+        if search_type == "mmr":
+            return vs.max_marginal_relevance_search_by_vector(vec, **skw)
+        if search_type == "similarity":
+            return vs.similarity_search_by_vector(vec, **skw)
+        return None
+
+    def _search_loaded(
+        self,
+        vs,
+        index_id: str,
+        query: str,
+        section: Optional[str] = None,
+        mode: str = "dense",
+        k_dense: int = 12,
+        search_type: str = "mmr",
+        search_kwargs: Optional[Dict[str, Any]] = None,
+        k_sparse: int = 30,
+        k_final: int = 12,
+        w_sparse: float = 0.6,
+        w_dense: float = 0.4,
+        k_rrf: int = 60,
+        query_vec: Optional[List[float]] = None,
+        dense_hits: Optional[List[Tuple[str, float]]] = None,
+    ) -> List[Dict[str, Any]]:
         if mode == "dense":
             # Dense-only using LangChain retriever interface
             # Apply section-specific defaults if available and not explicitly overridden
@@ -171,34 +601,39 @@ class RetrievalService:
             except Exception:
                 pass
             try:
-                retriever = vs.as_retriever(search_type=s_type, search_kwargs=skw)
-                docs = retriever.invoke(query)
+                docs = None
+                if query_vec is not None:
+                    docs = self._dense_docs_by_vector(vs, query_vec, s_type, skw)
+                if docs is None:
+                    retriever = vs.as_retriever(search_type=s_type, search_kwargs=skw)
+                    docs = retriever.invoke(query)
                 score_by_id = {}
             except Exception:
                 # Fallback: similarity with scores
                 docs_scores = vs.similarity_search_with_relevance_scores(query, k=k_dense)
                 docs = [d for d, _ in docs_scores]
-                score_by_id = {((d.metadata or {}).get("chunk_id")): float(s) for d, s in docs_scores}
+                score_by_id = {((d.metadata or _EMPTY_MD).get("chunk_id")): float(s) for d, s in docs_scores}
 
             results: List[Dict[str, Any]] = []
             for rank, doc in enumerate(docs):
-                md = doc.metadata or {}
+                md = doc.metadata or _EMPTY_MD
                 heading_norm = (md.get("heading_norm") or "").lower()
                 if not self._allowed_heading(section, heading_norm):
                     continue
                 page_span = md.get("page_span") or [1, 1]
                 page = page_span[0]
                 cid = md.get("chunk_id")
-                score = score_by_id.get(cid, None)
+                score = score_by_id.get(cid) if score_by_id else None
+                dense = 0.0 if score is None else score
                 results.append(
                     {
                         "chunk_id": cid,
                         "page": int(page),
                         "section_path": md.get("section_path"),
                         "heading_norm": heading_norm,
-                        "text": self._trim_text(doc.page_content or ""),
-                        "score": score if score is not None else max(0.0, 1.0 - rank * 0.05),
-                        "source_scores": {"sparse": 0.0, "dense": float(score) if score is not None else 0.0},
+                        "text": self._trim_text(self._doc_text(vs, index_id, doc), n_tokens_hint=md.get("n_tokens")),
+                        "score": max(0.0, 1.0 - rank * 0.05) if score is None else score,
+                        "source_scores": {"sparse": 0.0, "dense": dense},
                     }
                 )
                 if len(results) >= k_dense:
@@ -207,61 +642,62 @@ class RetrievalService:
 
         # Hybrid mode (BM25 + dense fusion)
         bm25 = load_bm25(self._bm25_path(index_id))
-        docs_ordered = self._load_docs_in_order(index_id, vs)
+        tables = self._load_index_tables(index_id)
 
-        # Sparse candidates
+        # Sparse candidates (rank-ordered)
         sparse_pairs = bm25_top_k(bm25, query, k=k_sparse)
-        sparse_norm = self._normalize_scores(sparse_pairs)
-        sparse_idx = {i for i, _ in sparse_pairs}
-
-        # Dense candidates
-        dense_results = vs.similarity_search_with_relevance_scores(query, k=k_dense)
-        pos_by_cid = {((d.metadata or {}).get("chunk_id")): i for i, d in enumerate(docs_ordered)}
-        dense_pairs: List[Tuple[int, float]] = []
-        for d, score in dense_results:
-            cid = (d.metadata or {}).get("chunk_id")
-            if cid in pos_by_cid:
-                dense_pairs.append((pos_by_cid[cid], float(score)))
-        dense_norm = self._normalize_scores(dense_pairs)
-        dense_idx = {i for i, _ in dense_pairs}
-
-        # Fuse
-        candidates = sorted(sparse_idx | dense_idx)
-        fused: List[Tuple[int, float]] = []
-        for i in candidates:
-            s = sparse_norm.get(i, 0.0)
-            d = dense_norm.get(i, 0.0)
-            fused.append((i, w_sparse * s + w_dense * d))
-        fused.sort(key=lambda x: x[1], reverse=True)
+
+        # Dense candidates (rank-ordered), mapped to chunks.json positions
+        if dense_hits is None:
+            dense_hits = [
+                ((d.metadata or _EMPTY_MD).get("chunk_id"), float(score))
+                for d, score in vs.similarity_search_with_relevance_scores(query, k=k_dense)
+            ]
+        pos_by_cid = tables.cid_to_idx
+        dense_pairs: List[Tuple[int, float]] = [
+            (pos_by_cid[cid], score) for cid, score in dense_hits if cid in pos_by_cid
+        ]
+
+        # Reciprocal Rank Fusion: w / (k_rrf + rank) per list; ranks start at 1
+        # and a list that misses a candidate contributes nothing
+        rrf: Dict[int, float] = {}
+        for w, pairs in ((w_sparse, sparse_pairs), (w_dense, dense_pairs)):
+            for rank, (i, _) in enumerate(pairs, start=1):
+                rrf[i] = rrf.get(i, 0.0) + w / (k_rrf + rank)
+        sparse_raw = dict(sparse_pairs)
+        dense_raw = dict(dense_pairs)
+        # Heap of (-score, position): pops best-first with ties broken by chunk
+        # position, and only the candidates actually consumed get ordered
+        fused = [(-score, i) for i, score in rrf.items()]
+        heapq.heapify(fused)
 
         # Build snippet results with filters
         results: List[Dict[str, Any]] = []
-        for i, score in fused:
-            if i < 0 or i >= len(docs_ordered):
+        n = len(tables.chunk_ids)
+        while fused and len(results) < k_final:
+            neg_score, i = heapq.heappop(fused)
+            score = -neg_score
+            if i < 0 or i >= n:
                 continue
-            doc = docs_ordered[i]
-            md = doc.metadata or {}
-            heading_norm = (md.get("heading_norm") or "").lower()
+            heading_norm = tables.headings_norm[i]
             if not self._allowed_heading(section, heading_norm):
                 continue
-            page_span = md.get("page_span") or [1, 1]
-            page = page_span[0]
-            text = self._trim_text(doc.page_content or "")
+            text = self._trim_text(
+                self._chunk_text(vs, index_id, i, tables.chunk_ids[i]), n_tokens_hint=tables.n_tokens[i]
+            )
             results.append(
                 {
-                    "chunk_id": md.get("chunk_id"),
-                    "page": int(page),
-                    "section_path": md.get("section_path"),
+                    "chunk_id": tables.chunk_ids[i],
+                    "page": tables.pages[i],
+                    "section_path": tables.section_paths[i],
                     "heading_norm": heading_norm,
                     "text": text,
                     "score": score,
                     "source_scores": {
-                        "sparse": float(sparse_norm.get(i, 0.0)),
-                        "dense": float(dense_norm.get(i, 0.0)),
+                        "sparse": float(sparse_raw.get(i, 0.0)),
+                        "dense": float(dense_raw.get(i, 0.0)),
                     },
                 }
             )
-            if len(results) >= k_final:
-                break
 
         return results
@@ -1,3 +1,8 @@
+from typing import Tuple
+
+# Generated ICF sections, in document order
+DEFAULT_SECTIONS: Tuple[str, ...] = ("Purpose", "Procedures", "Risks", "Benefits")
+
 SECTION_QUERIES = {
     "Purpose": [
         # Existing
@@ -8,11 +8,17 @@ Minimal helpers to support the ingest flow prior to embeddings:
 
 from __future__ import annotations
 
-import glob
 import json
 import os
+import threading
 import time
-from typing import Any, Dict, List, Optional
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+try:
+    import fcntl
+except Exception:  # pragma: no cover - import optional (not available on Windows)
+    fcntl = None  # type: ignore
 
 from app.config import Config, ensure_data_dirs
 from app.utils.ids import new_id
@@ -23,18 +29,124 @@ FILES_DB = os.path.join(Config.DB_DIR, "files.json")
 INDEXES_DB = os.path.join(Config.DB_DIR, "indexes.json")
 RUNS_DB = os.path.join(Config.DB_DIR, "runs.json")
 
+# file_id -> (expires_at, index_id); bounded staleness for repeat /generate calls
+_LATEST_INDEX_TTL = 30.0
+_LATEST_INDEX_CACHE: Dict[str, Tuple[float, str]] = {}
+_LATEST_INDEX_LOCK = threading.Lock()
+
+# Section threads of one run update meta.json/state.json concurrently
+_RUN_META_LOCK = threading.Lock()
+
+
+# path -> ((mtime_ns, size), parsed DB); re-parsed only when the file changes
+_DB_CACHE: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+_DB_CACHE_LOCK = threading.Lock()
+
+
+def _db_stamp(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
 
 def _load_db(path: str) -> Dict[str, Any]:
+    """Return a (shallow) copy of a registry DB, parsing the file only when it changed."""
     ensure_data_dirs()
+    stamp = _db_stamp(path)
+    with _DB_CACHE_LOCK:
+        cached = _DB_CACHE.get(path)
+        if stamp is not None and cached is not None and cached[0] == stamp:
+            return dict(cached[1])
     data = read_json(path, default=None)
     if not isinstance(data, dict):
         return {}
-    return data
+    if stamp is not None:
+        with _DB_CACHE_LOCK:
+            _DB_CACHE[path] = (stamp, data)
+    return dict(data)
 
 
 def _save_db(path: str, data: Dict[str, Any]) -> None:
     ensure_data_dirs()
     write_json(path, data)
+    stamp = _db_stamp(path)
+    with _DB_CACHE_LOCK:
+        if stamp is None:
+            _DB_CACHE.pop(path, None)
+        else:
+            _DB_CACHE[path] = (stamp, dict(data))
+
+
+_DB_WRITE_LOCK = threading.Lock()
+
+
+@contextmanager
+def _locked_db(path: str) -> Iterator[Dict[str, Any]]:
+    """Read-modify-write a registry DB under a thread lock plus an exclusive flock.
+
+    Yields the current DB; it is saved when the block exits normally. The lock
+    is taken on a ``<path>.lock`` sidecar because the DB file itself is
+    replaced on every write.
+    """
+    ensure_data_dirs()
+    with _DB_WRITE_LOCK, open(path + ".lock", "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            db = _load_db(path)
+            yield db
+            _save_db(path, db)
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class RunStateCache:
+    """Process-wide in-memory copy of the runs DB.
+
+    runs.json is parsed once per process; ``create_run``/``finalize_run``
+    mutate the cached registry under a lock and write it with ``flush()``,
+    which merges the changed records into the on-disk DB under ``_locked_db``
+    so entries written by other processes are kept.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._data: Optional[Dict[str, Any]] = None
+        self._dirty: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def _db(self) -> Dict[str, Any]:
+        if self._data is None:
+            self._data = _load_db(self.path)
+        return self._data
+
+    def set(self, run_id: str, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self._db()[run_id] = record
+            self._dirty.add(run_id)
+
+    def update(self, run_id: str, **fields: Any) -> None:
+        """Merge ``fields`` into an existing run record (unknown runs are ignored)."""
+        with self._lock:
+            db = self._db()
+            rec = db.get(run_id)
+            if isinstance(rec, dict):
+                db[run_id] = {**rec, **fields}
+                self._dirty.add(run_id)
+
+    def flush(self) -> None:
+        with self._lock, _locked_db(self.path) as disk:
+            db = self._db()
+            for run_id in self._dirty:
+                disk[run_id] = db[run_id]
+            self._dirty.clear()
+            self._data = dict(disk)
+
+
+_RUNS = RunStateCache(RUNS_DB)
 
 
 def resolve_file_path(file_id: str) -> Optional[str]:
@@ -54,10 +166,14 @@ def resolve_file_path(file_id: str) -> Optional[str]:
     # Fallback to probing directory
     fdir = os.path.join(Config.FILES_DIR, file_id)
     if os.path.isdir(fdir):
-        cand = []
-        cand.extend(glob.glob(os.path.join(fdir, "*.pdf")))
-        cand.extend(glob.glob(os.path.join(fdir, "*.docx")))
-        if len(cand) == 1 and os.path.exists(cand[0]):
+        # One directory scan instead of a glob per extension
+        with os.scandir(fdir) as it:
+            cand = [
+                e.path
+                for e in it
+                if e.name.endswith((".pdf", ".docx")) and not e.name.startswith(".") and e.is_file()
+            ]
+        if len(cand) == 1:
             return os.path.abspath(cand[0])
     return None
 
@@ -70,12 +186,12 @@ def create_index(file_id: str) -> str:
     ensure_dir(idir)
 
     # Persist in indexes DB
-    idx_db = _load_db(INDEXES_DB)
-    idx_db[index_id] = {
-        "file_id": file_id,
-        "created_at": int(time.time()),
-    }
-    _save_db(INDEXES_DB, idx_db)
+    with _locked_db(INDEXES_DB) as idx_db:
+        idx_db[index_id] = {
+            "file_id": file_id,
+            "created_at": int(time.time()),
+        }
+    invalidate_latest_index(file_id)
     return index_id
 
 
@@ -115,16 +231,31 @@ def register_uploaded_file(
         "path": os.path.abspath(path),
         "created_at": int(time.time()),
     }
-    db = _load_db(FILES_DB)
-    db[file_id] = rec
-    _save_db(FILES_DB, db)
+    with _locked_db(FILES_DB) as db:
+        db[file_id] = rec
     return rec
 
 
 # -------- Index lookup helpers --------
 
+def invalidate_latest_index(file_id: str) -> None:
+    """Drop the cached latest index for file_id (called when a new index is created)."""
+    with _LATEST_INDEX_LOCK:
+        _LATEST_INDEX_CACHE.pop(file_id, None)
+
+
 def get_latest_index_for_file(file_id: str) -> Optional[str]:
-    """Return the most recently created index_id for a given file_id, if any."""
+    """Return the most recently created index_id for a given file_id, if any.
+
+    Hits are cached for a short TTL; misses are not cached so a fresh ingest
+    is visible immediately.
+    """
+    now = time.monotonic()
+    with _LATEST_INDEX_LOCK:
+        cached = _LATEST_INDEX_CACHE.get(file_id)
+    if cached and cached[0] > now:
+        return cached[1]
+
     idx_db = _load_db(INDEXES_DB)
     candidates = [
         (iid, meta.get("created_at", 0))
@@ -134,7 +265,10 @@ def get_latest_index_for_file(file_id: str) -> Optional[str]:
     if not candidates:
         return None
     candidates.sort(key=lambda x: x[1], reverse=True)
-    return candidates[0][0]
+    index_id = candidates[0][0]
+    with _LATEST_INDEX_LOCK:
+        _LATEST_INDEX_CACHE[file_id] = (now + _LATEST_INDEX_TTL, index_id)
+    return index_id
 
 
 # -------- Run state helpers --------
@@ -155,10 +289,11 @@ def create_run(file_id: str, index_id: str) -> str:
         "started_at": int(time.time()),
     }
     write_json(os.path.join(rdir, "meta.json"), meta)
+    # Consolidated pollable state: one file read per GET /runs/<run_id>
+    write_json(os.path.join(rdir, "state.json"), {"version": 0, "status": "running", "sections": {}})
     # registry
-    db = _load_db(RUNS_DB)
-    db[run_id] = {"file_id": file_id, "index_id": index_id, "created_at": meta["started_at"], "status": "running"}
-    _save_db(RUNS_DB, db)
+    _RUNS.set(run_id, {"file_id": file_id, "index_id": index_id, "created_at": meta["started_at"], "status": "running"})
+    _RUNS.flush()
     return run_id
 
 
@@ -166,6 +301,39 @@ def run_dir(run_id: str) -> str:
     return os.path.join(Config.RUNS_DIR, run_id)
 
 
+def _update_run_meta(run_id: str, **fields: Any) -> Dict[str, Any]:
+    path = os.path.join(run_dir(run_id), "meta.json")
+    with _RUN_META_LOCK:
+        meta = read_json(path, default={}) or {}
+        meta.update(fields)
+        write_json(path, meta)
+    return meta
+
+
+def _update_run_state(run_id: str, *, status: Optional[str] = None, section: Optional[Dict[str, Any]] = None) -> None:
+    """Apply a change to state.json and bump its version (atomic replace via write_json)."""
+    path = os.path.join(run_dir(run_id), "state.json")
+    with _RUN_META_LOCK:
+        state = read_json(path, default=None)
+        if not isinstance(state, dict):
+            return  # run predates state.json; readers fall back to per-section files
+        if status is not None:
+            state["status"] = status
+        if section is not None:
+            state.setdefault("sections", {})[section["name"]] = {
+                "text": section["text"],
+                "warnings": section["warnings"],
+            }
+        state["version"] = int(state.get("version", 0)) + 1
+        write_json(path, state)
+
+
+def read_run_state(run_id: str) -> Optional[Dict[str, Any]]:
+    """Return the consolidated run state, or None for runs without state.json."""
+    state = read_json(os.path.join(run_dir(run_id), "state.json"), default=None)
+    return state if isinstance(state, dict) else None
+
+
 def write_section_artifacts(
     run_id: str,
     name: str,
@@ -182,17 +350,29 @@ def write_section_artifacts(
         os.path.join(rdir, "sections", f"{name}.json"),
         {"name": name, "draft_text": draft_text, "final_text": final_text, "warnings": warnings, "facts": facts},
     )
+    # Mirror the pollable fields into state.json
+    _update_run_state(
+        run_id,
+        section={"name": name, "text": final_text or draft_text, "warnings": warnings or []},
+    )
+    # A rewritten section invalidates any previously assembled DOCX
+    meta_path = os.path.join(rdir, "meta.json")
+    with _RUN_META_LOCK:
+        meta = read_json(meta_path, default={}) or {}
+        if meta.pop("docx", None) is not None:
+            write_json(meta_path, meta)
+
+
+def set_run_docx(run_id: str, path: str) -> None:
+    """Record the assembled DOCX file name in the run's meta.json."""
+    _update_run_meta(run_id, docx=os.path.basename(path))
 
 
 def finalize_run(run_id: str, status: str = "succeeded") -> None:
-    rdir = run_dir(run_id)
-    meta = read_json(os.path.join(rdir, "meta.json"), default={}) or {}
-    meta.update({"status": status, "finished_at": int(time.time())})
-    write_json(os.path.join(rdir, "meta.json"), meta)
-    db = _load_db(RUNS_DB)
-    if run_id in db:
-        db[run_id].update({"status": status, "finished_at": meta["finished_at"]})
-    _save_db(RUNS_DB, db)
+    meta = _update_run_meta(run_id, status=status, finished_at=int(time.time()))
+    _update_run_state(run_id, status=status)
+    _RUNS.update(run_id, status=status, finished_at=meta["finished_at"])
+    _RUNS.flush()
 
 
 def build_and_write_run_logs(run_id: str) -> dict:
@@ -213,12 +393,16 @@ def build_and_write_run_logs(run_id: str) -> dict:
     # Collect snippets per section
     sections = {}
     snippets_dir = os.path.join(rdir, "snippets")
-    if os.path.isdir(snippets_dir):
-        for name in os.listdir(snippets_dir):
-            if not name.endswith(".json"):
-                continue
-            sec = os.path.splitext(name)[0]
-            items = read_json(os.path.join(snippets_dir, name), default=[]) or []
+    try:
+        entries = list(os.scandir(snippets_dir))
+    except OSError:
+        entries = []
+    for entry in entries:
+        name = entry.name
+        if name.endswith(".json") and entry.is_file():
+            sec = name[:-5]
+            # read_json parses with orjson when installed
+            items = read_json(entry.path, default=[]) or []
             # Only keep essential provenance fields
             prov = [
                 {
@@ -2,38 +2,118 @@
 
 Uses LangChain with Google Gemini embeddings and FAISS for vector storage.
 Includes BM25 for hybrid retrieval.
+
+LangChain, the Gemini client and FAISS are imported where they are first
+used, so importing this module (or spawning a chunking worker, which only
+needs the text splitter) does not pay their initialization.
 """
 
 from __future__ import annotations
 
-import hashlib
+import copy
+import multiprocessing
 import os
-from typing import Any, Dict, List
+import random
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from itertools import chain, islice
+from typing import TYPE_CHECKING, Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
 import logging
 import time
 
-from app.config import Config
+from app.config import AppConfig, Config
+from app.utils.ids import compute_chunk_id
 from app.utils.io_utils import ensure_dir, read_json
 from app.utils.bm25 import build_bm25_model, save_bm25
-from dotenv import load_dotenv
+from app.utils.langchain_processing import count_tokens_batch
+from app.utils.text_store import write_text_store
 
-load_dotenv()
+if TYPE_CHECKING:  # pragma: no cover
+    from langchain.schema import Document
+    from langchain_community.vectorstores import FAISS
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
 
-# Import required libraries
 try:
-    from langchain_community.document_loaders import PyMuPDFLoader
+    from google.api_core.exceptions import ResourceExhausted
+except Exception:  # pragma: no cover - import optional
+    ResourceExhausted = None  # type: ignore
+
+
+def _is_rate_limited(exc: BaseException) -> bool:
+    """True for Gemini quota errors (ResourceExhausted / HTTP 429), including wrapped ones."""
+    while exc is not None:
+        if ResourceExhausted is not None and isinstance(exc, ResourceExhausted):
+            return True
+        if "429" in str(exc) or "RESOURCE_EXHAUSTED" in str(exc):
+            return True
+        exc = exc.__cause__
+    return False
+
+
+# faiss warns below 39 training points per IVF centroid
+_IVF_MIN_POINTS_PER_LIST = 39
+# Refine stages (",RFlat") re-rank k * this many PQ candidates with exact vectors;
+# PQ alone ranks too coarsely to reach the recall bar. Saved with the index.
+_REFINE_K_FACTOR = 32
+
+_SPLIT_SEPARATORS = ["\n\n", "\n", ". ", "? ", "! ", "; ", ", ", " ", ""]
+# Below this many pages the splitter runs inline; process startup would dominate
+_PARALLEL_SPLIT_MIN_PAGES = 32
+
+
+@lru_cache(maxsize=4)
+def _splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
     from langchain_text_splitters import RecursiveCharacterTextSplitter
-    from langchain_google_genai import GoogleGenerativeAIEmbeddings
-    from langchain_community.vectorstores import FAISS
-    from langchain.schema import Document
-except ImportError as e:
-    raise RuntimeError(f"Required dependencies not installed: {e}")
+
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=_SPLIT_SEPARATORS,
+        keep_separator=True,
+    )
+
+
+def _split_page_text(args: Tuple[str, int, int]) -> List[str]:
+    # Module-level so ProcessPoolExecutor can pickle it; one splitter per worker
+    text, chunk_size, chunk_overlap = args
+    return _splitter(chunk_size, chunk_overlap).split_text(text)
+
+
+_SPLIT_POOL: Optional[ProcessPoolExecutor] = None
+_SPLIT_POOL_LOCK = threading.Lock()
+
+
+def _split_pool(workers: int) -> ProcessPoolExecutor:
+    """Process-wide chunking pool, created on first large ingest.
+
+    Workers come from a forkserver (spawn where unavailable), never a fork of
+    this multi-threaded server: inherited locks and gRPC channels are not
+    fork-safe.
+    """
+    global _SPLIT_POOL
+    with _SPLIT_POOL_LOCK:
+        if _SPLIT_POOL is None:
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _SPLIT_POOL = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+        return _SPLIT_POOL
+
+
+def _discard_split_pool(pool: ProcessPoolExecutor) -> None:
+    # A worker died (BrokenProcessPool); the next ingest starts a fresh pool
+    global _SPLIT_POOL
+    with _SPLIT_POOL_LOCK:
+        if _SPLIT_POOL is pool:
+            _SPLIT_POOL = None
+    pool.shutdown(wait=False)
 
 
 class VectorStoreService:
     """Build and manage per-index FAISS and BM25 stores."""
 
-    def __init__(self, cfg: Config = Config):
+    def __init__(self, cfg: AppConfig = Config):
         self.cfg = cfg
         # Target ~800 tokens per chunk (4 chars/token)
         self.target_chunk_size = 3200
@@ -48,35 +128,30 @@ class VectorStoreService:
     def _bm25_path(self, index_id: str) -> str:
         return os.path.join(self._index_dir(index_id), "bm25.json")
 
-    def _chunk_documents(self, documents: List[Document]) -> List[Document]:
+    def _chunk_documents(self, documents: Iterable[Document]) -> List[Document]:
         """
         Standard LangChain chunking - simple and reliable.
         Creates chunks of ~800 tokens with overlap.
+
+        ``documents`` may be a lazy page stream; pages are split as they arrive.
         """
-        if not documents:
-            logging.error("No documents provided for chunking")
-            return []
-            
-        logging.info(f"Starting chunking for {len(documents)} documents")
-        
-        # Use RecursiveCharacterTextSplitter for intelligent splitting
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.target_chunk_size,
-            chunk_overlap=self.chunk_overlap,
-            separators=["\n\n", "\n", ". ", "? ", "! ", "; ", ", ", " ", ""],
-            keep_separator=True,
-        )
-        
-        # Split all documents
+        from langchain.schema import Document
+
+        logging.info("Starting chunking")
+
+        def _pages() -> Iterator[Document]:
+            for doc in documents:
+                if not doc.page_content or not doc.page_content.strip():
+                    logging.warning(f"Skipping empty document on page {doc.metadata.get('page', 'unknown')}")
+                    continue
+                yield doc
+
+        # Split all documents (RecursiveCharacterTextSplitter, across processes for large PDFs)
         all_chunks = []
-        for doc in documents:
-            if not doc.page_content or not doc.page_content.strip():
-                logging.warning(f"Skipping empty document on page {doc.metadata.get('page', 'unknown')}")
-                continue
-            
-            # Split the document
-            chunks = splitter.split_documents([doc])
-            
+        for doc, parts in self._iter_split(_pages()):
+            # Same Documents split_documents() would build: one metadata copy per chunk
+            chunks = [Document(page_content=t, metadata=copy.deepcopy(doc.metadata)) for t in parts]
+
             # Add chunk index to metadata
             for i, chunk in enumerate(chunks):
                 chunk.metadata.update({
@@ -98,20 +173,80 @@ class VectorStoreService:
         logging.info(f"Chunking completed: {len(filtered_chunks)} total chunks")
         return filtered_chunks
 
+    def _iter_split(self, pages: Iterable[Document]) -> Iterator[Tuple[Document, List[str]]]:
+        """Yield ``(page, chunk_texts)`` in page order as pages stream in.
+
+        The splitter is pure-Python regex work, so threads would serialize on
+        the GIL. Past ``_PARALLEL_SPLIT_MIN_PAGES`` pages, work goes to the
+        process-wide pool of CHUNK_WORKERS processes while the caller keeps
+        decoding PDF pages; at most a few pages per worker are in flight. A
+        page whose worker fails, or any page once the pool is broken, is split
+        inline.
+        """
+        size, overlap = self.target_chunk_size, self.chunk_overlap
+        it = iter(pages)
+        head = list(islice(it, _PARALLEL_SPLIT_MIN_PAGES))
+        workers = self.cfg.CHUNK_WORKERS
+        if workers <= 1 or len(head) < _PARALLEL_SPLIT_MIN_PAGES:
+            for doc in chain(head, it):
+                yield doc, _split_page_text((doc.page_content, size, overlap))
+            return
+
+        window = workers * 4
+        pending: Deque[Tuple[Document, Any]] = deque()
+
+        def _result(doc: Document, fut: Any) -> List[str]:
+            try:
+                return fut.result()
+            except Exception as e:
+                logging.warning(f"Parallel chunking failed, splitting page inline: {e}")
+                return _split_page_text((doc.page_content, size, overlap))
+
+        pool: Optional[ProcessPoolExecutor] = _split_pool(workers)
+        for doc in chain(head, it):
+            args = (doc.page_content, size, overlap)
+            if pool is not None:
+                try:
+                    pending.append((doc, pool.submit(_split_page_text, args)))
+                except RuntimeError as e:  # BrokenProcessPool / shut down
+                    logging.warning(f"Chunking pool unavailable, splitting inline: {e}")
+                    _discard_split_pool(pool)
+                    pool = None
+            if pool is None:
+                while pending:
+                    d, fut = pending.popleft()
+                    yield d, _result(d, fut)
+                yield doc, _split_page_text(args)
+            elif len(pending) >= window:
+                d, fut = pending.popleft()
+                yield d, _result(d, fut)
+        while pending:
+            d, fut = pending.popleft()
+            yield d, _result(d, fut)
+
     def build_from_pdf(self, file_path: str, file_id: str, index_id: str) -> Dict[str, Any]:
         """Process PDF → standard chunks → vector store."""
         logging.info(f"Processing PDF: {file_path}")
         
-        # Load PDF pages
+        # Stream PDF pages straight into chunking: decode overlaps splitting and
+        # only in-flight pages are held, not the whole document's page texts
+        from langchain_community.document_loaders import PyMuPDFLoader
+
         loader = PyMuPDFLoader(file_path)
-        documents = loader.load()
-        logging.info(f"Loaded {len(documents)} pages")
-        
-        if not documents:
+        n_pages = 0
+
+        def _counted_pages() -> Iterator[Document]:
+            nonlocal n_pages
+            for doc in loader.lazy_load():
+                n_pages += 1
+                yield doc
+
+        chunk_docs = self._chunk_documents(_counted_pages())
+        logging.info(f"Loaded {n_pages} pages")
+
+        if not n_pages:
             raise RuntimeError("No pages loaded from PDF")
-        
-        # Standard chunking
-        chunk_docs = self._chunk_documents(documents)
+
         logging.info(f"Created {len(chunk_docs)} chunks")
         
         if not chunk_docs:
@@ -127,16 +262,19 @@ class VectorStoreService:
             "heading": "Document Content",
             "heading_norm": "document content",
             "page_start": 1,
-            "page_end": len(documents),
+            "page_end": n_pages,
             "body": "",
             "paras": []
         })
         
+        # Exact token counts for all chunks in one batched tiktoken call; stored as
+        # n_tokens too, so the vector store build does not count them again
+        token_counts = count_tokens_batch([d.page_content for d in chunk_docs])
+
         # Convert chunks to expected format
         for i, chunk_doc in enumerate(chunk_docs):
-            chunk_id = hashlib.sha1(
-                f"{file_id}|{i}|{chunk_doc.page_content[:100]}".encode('utf-8')
-            ).hexdigest()
+            # (file_id, position) is unique within an index; no need to hash chunk text
+            chunk_id = compute_chunk_id(f"{file_id}|{i}")
             
             # Get page info from metadata
             page_num = chunk_doc.metadata.get("original_page", 1)
@@ -148,16 +286,16 @@ class VectorStoreService:
                 "heading_norm": "document content",
                 "page_span": [page_num, page_num],
                 "text": chunk_doc.page_content,
+                "n_tokens": token_counts[i],
                 "metadata": {
                     "source": file_path,
                     "page": page_num,
                     "chunk_index": i,
-                    "token_count": len(chunk_doc.page_content) // 4
+                    "token_count": token_counts[i],
                 }
             })
         
         # Log chunk statistics
-        token_counts = [c["metadata"]["token_count"] for c in chunks]
         if token_counts:
             avg_tokens = sum(token_counts) / len(token_counts)
             min_tokens = min(token_counts)
@@ -173,7 +311,7 @@ class VectorStoreService:
             "store": "none",
             "embed_model": None,
             "n_chunks": len(chunks),
-            "pages": len(documents),
+            "pages": n_pages,
             "created_at": int(time.time()),
             "stage": "parsed_segmented_chunked",
             "vector_stats": {},
@@ -181,31 +319,52 @@ class VectorStoreService:
         
         write_index_artifacts(index_id, initial_meta, sections, chunks)
         
-        return self._build_vector_store(index_id, chunks, sections)
+        stats = self._build_vector_store(index_id, chunks, sections)
+        # Counted while streaming pages, so callers need not reopen the PDF
+        stats["pages"] = n_pages
+        return stats
 
     def _build_vector_store(self, index_id: str, chunks: List[Dict], sections: List[Dict]) -> Dict[str, Any]:
         """Build FAISS and BM25 indices from chunks."""
+        from langchain.schema import Document
+        from langchain_community.vectorstores import FAISS
+        from langchain_community.vectorstores.utils import DistanceStrategy
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
         logging.info(f"Building vector store for {len(chunks)} chunks")
         
         if not chunks:
             raise RuntimeError("No chunks provided for vector store creation")
         
-        # Convert to LangChain documents
+        # Convert to LangChain documents; texts/headings are kept as parallel
+        # lists (FAISS row order) for the embedding, text store and BM25 passes
         docs = []
+        texts: List[str] = []
+        headings: List[str] = []
+
+        # Exact token counts, persisted so retrieval can skip re-tokenizing short
+        # chunks; chunks that lack one are counted in a single batch
+        uncounted = [c for c in chunks if (c.get("text") or "").strip() and c.get("n_tokens") is None]
+        for chunk, n in zip(uncounted, count_tokens_batch([c["text"] for c in uncounted])):
+            chunk["n_tokens"] = n
+
         for chunk in chunks:
             # Skip chunks with empty text
             if not chunk.get("text") or not chunk["text"].strip():
                 logging.warning(f"Skipping chunk with empty text: {chunk.get('chunk_id')}")
                 continue
-                
+
             meta = {
                 "chunk_id": chunk["chunk_id"],
                 "file_id": chunk["file_id"],
                 "section_path": chunk["section_path"],
                 "heading_norm": chunk["heading_norm"],
                 "page_span": chunk["page_span"],
+                "n_tokens": chunk["n_tokens"],
             }
             docs.append(Document(page_content=chunk["text"], metadata=meta))
+            texts.append(chunk["text"])
+            headings.append(chunk["heading_norm"])
         
         if not docs:
             raise RuntimeError("No valid documents created from chunks")
@@ -215,25 +374,43 @@ class VectorStoreService:
         # Create embeddings and FAISS index
         embeddings = GoogleGenerativeAIEmbeddings(model=self.cfg.EMBED_MODEL)
         
-        # Safety check - test embeddings first
         try:
-            test_embedding = embeddings.embed_query("test")
-            logging.info(f"Embedding test successful, dimension: {len(test_embedding)}")
+            vectors = self._embed_texts(embeddings, texts)
         except Exception as e:
-            logging.error(f"Embedding test failed: {e}")
+            logging.error(f"Embedding failed: {e}")
             raise RuntimeError(f"Google Gemini embeddings not working: {e}")
+        logging.info(f"Embedded {len(vectors)} chunks, dimension: {len(vectors[0])}")
+        
+        # Cosine similarity: vectors are L2-normalized once here and searched with
+        # an inner-product index, so raw index.search scores need no conversion
+        vs = FAISS.from_embeddings(
+            text_embeddings=list(zip(texts, vectors)),
+            embedding=embeddings,
+            metadatas=[d.metadata for d in docs],
+            normalize_L2=True,
+            distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT,
+        )
+        self._maybe_build_ann_index(vs)
         
-        vs = FAISS.from_documents(documents=docs, embedding=embeddings)
-        
-        # Save FAISS
+        # Chunk text lives in a memory-mapped side file (FAISS row order); the
+        # pickled docstore keeps metadata only, so index loads stay small
         fdir = self._faiss_dir(index_id)
         ensure_dir(fdir)
+        write_text_store(fdir, texts)
+        for doc in vs.docstore._dict.values():
+            doc.page_content = ""
+
+        # Save FAISS
         vs.save_local(folder_path=fdir, index_name="index")
         logging.info(f"Saved FAISS index to {fdir}")
+
+        # Drop any vectorstore cached for a previous build of this index
+        from app.services.retrieval_service import RetrievalService
+
+        RetrievalService.invalidate(index_id)
         
         # Build and save BM25
-        corpus = [f"{d.metadata['heading_norm']}\n{d.page_content}" for d in docs]
-        bm25 = build_bm25_model(corpus)
+        bm25 = build_bm25_model(texts, headings=headings)
         save_bm25(self._bm25_path(index_id), bm25)
         logging.info(f"Saved BM25 index")
         
@@ -261,6 +438,126 @@ class VectorStoreService:
         
         return final_meta["vector_stats"]
 
+    def _embed_texts(self, embeddings: GoogleGenerativeAIEmbeddings, texts: List[str]) -> List[List[float]]:
+        """Embed chunk texts with one request per ``EMBED_BATCH_SIZE`` texts.
+
+        Up to ``EMBED_MAX_IN_FLIGHT`` batch requests run concurrently; results
+        are reassembled in input order.
+        """
+        size = max(1, self.cfg.EMBED_BATCH_SIZE)
+        batches = [texts[i : i + size] for i in range(0, len(texts), size)]
+        workers = max(1, min(self.cfg.EMBED_MAX_IN_FLIGHT, len(batches)))
+        if workers == 1:
+            return [v for batch in batches for v in self._embed_batch(embeddings, batch, size)]
+        results: List[List[List[float]]] = [[] for _ in batches]
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            futures = {ex.submit(self._embed_batch, embeddings, batch, size): i for i, batch in enumerate(batches)}
+            for fut in as_completed(futures):
+                results[futures[fut]] = fut.result()
+        return [v for batch_vectors in results for v in batch_vectors]
+
+    @staticmethod
+    def _embed_batch(
+        embeddings: GoogleGenerativeAIEmbeddings, batch: List[str], size: int, retries: int = 4
+    ) -> List[List[float]]:
+        # Small jitter spreads concurrent requests; quota errors back off exponentially
+        time.sleep(random.uniform(0, 0.05))
+        for attempt in range(retries + 1):
+            try:
+                return embeddings.embed_documents(batch, batch_size=size)
+            except Exception as e:
+                if attempt == retries or not _is_rate_limited(e):
+                    raise
+                delay = 2 ** attempt + random.uniform(0, 0.5)
+                logging.warning(f"Embedding rate limited; retrying in {delay:.1f}s")
+                time.sleep(delay)
+        return []
+
+    def _index_specs(self, n: int) -> List[str]:
+        """faiss.index_factory candidates for a store of ``n`` vectors, preferred first."""
+        cfg = self.cfg
+        specs: List[str] = []
+        if 0 < cfg.FAISS_IVFPQ_MIN_VECTORS <= n:
+            specs.append(cfg.FAISS_IVFPQ_FACTORY)
+        if 0 < cfg.FAISS_ANN_MIN_VECTORS <= n:
+            specs.append(cfg.FAISS_INDEX_FACTORY)
+        else:
+            specs.extend([cfg.FAISS_QUANTIZER, cfg.FAISS_QUANTIZER_FALLBACK])
+        specs = [s for s in specs if s and s.lower() not in ("flat", "none")]
+        return list(dict.fromkeys(specs))
+
+    @staticmethod
+    def _ivf_nlist(n: int) -> int:
+        # ~4*sqrt(N) lists, but no more than k-means can train well on N points
+        return max(1, min(int(4 * n ** 0.5), n // _IVF_MIN_POINTS_PER_LIST))
+
+    @staticmethod
+    def _pq_subquantizers(d: int) -> int:
+        # Largest divisor of d that is <= d/12 (64 for 768-d, 256 for 3072-d)
+        target = max(1, d // 12)
+        return next(m for m in range(target, 0, -1) if d % m == 0)
+
+    def _maybe_build_ann_index(self, vs: FAISS) -> None:
+        """Replace the flat FAISS index with a compressed and/or ANN index.
+
+        Candidates by store size: ``FAISS_IVFPQ_FACTORY`` (``IVF{nlist},PQ{m}x8,RFlat``)
+        from ``FAISS_IVFPQ_MIN_VECTORS`` (opt-in), ``FAISS_INDEX_FACTORY`` (e.g. ``HNSW32``)
+        from ``FAISS_ANN_MIN_VECTORS``, and ``FAISS_QUANTIZER`` (e.g. ``SQ8``, 4x
+        fewer vector bytes per scan) then ``FAISS_QUANTIZER_FALLBACK`` (``SQfp16``,
+        2x) below that. ``{nlist}`` is ~4*sqrt(N), capped so each list has
+        enough training points, and ``{m}`` a divisor of the dimension. The first candidate whose recall@10
+        against the exact index reaches ``FAISS_MIN_RECALL`` replaces it; if
+        none does, the flat index is kept. The metric and vector order are
+        preserved, so LangChain's ``index_to_docstore_id`` mapping stays valid.
+        """
+        n = vs.index.ntotal
+        specs = self._index_specs(n) if n else []
+        if not specs:
+            return
+        import faiss
+
+        d = vs.index.d
+        xb = vs.index.reconstruct_n(0, n)
+        for spec in specs:
+            spec = spec.replace("{nlist}", str(self._ivf_nlist(n))).replace(
+                "{m}", str(self._pq_subquantizers(d))
+            )
+            index = faiss.index_factory(d, spec, vs.index.metric_type)
+            if not index.is_trained:
+                index.train(xb)
+            index.add(xb)
+            try:
+                # MMR reconstructs candidate vectors; IVF indexes need a direct map for that
+                faiss.extract_index_ivf(index).make_direct_map()
+            except RuntimeError:
+                pass
+            # Measure recall with the query-time settings applied at load
+            for name, value in (("nprobe", self.cfg.FAISS_NPROBE), ("efSearch", self.cfg.FAISS_EF_SEARCH)):
+                try:
+                    faiss.ParameterSpace().set_index_parameter(index, name, value)
+                except RuntimeError:
+                    pass
+            if hasattr(index, "k_factor"):
+                index.k_factor = _REFINE_K_FACTOR
+            recall = self._recall_at_k(vs.index, index, xb)
+            if recall >= self.cfg.FAISS_MIN_RECALL:
+                vs.index = index
+                logging.info(f"Built FAISS {spec} index over {n} vectors (recall@10={recall:.3f})")
+                return
+            logging.info(f"Rejected FAISS {spec} index: recall@10={recall:.3f} over {n} vectors")
+        logging.info(f"Keeping flat FAISS index over {n} vectors")
+
+    @staticmethod
+    def _recall_at_k(exact: Any, approx: Any, xb: Any, k: int = 10, n_queries: int = 100) -> float:
+        """Mean overlap of approx vs exact top-k, using stored vectors as queries."""
+        step = max(1, len(xb) // n_queries)
+        xq = xb[::step][:n_queries]
+        k = min(k, exact.ntotal)
+        _, truth = exact.search(xq, k)
+        _, got = approx.search(xq, k)
+        hits = sum(len(set(t) & set(g)) for t, g in zip(truth.tolist(), got.tolist()))
+        return hits / float(len(xq) * k)
+
     def build_from_chunks(self, index_id: str) -> Dict[str, Any]:
         """Build vector store from existing chunks (backward compatibility)."""
         idir = self._index_dir(index_id)
@@ -276,6 +573,6 @@ class VectorStoreService:
         for chunk in chunks:
             if not chunk.get("chunk_id"):
                 content = f"{chunk.get('file_id', 'unknown')}|{chunk.get('text', '')[:100]}"
-                chunk["chunk_id"] = hashlib.sha1(content.encode('utf-8')).hexdigest()
+                chunk["chunk_id"] = compute_chunk_id(content)
         
         return self._build_vector_store(index_id, chunks, sections)
\ No newline at end of file
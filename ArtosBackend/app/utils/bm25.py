@@ -1,30 +1,78 @@
 """Lightweight BM25 utilities for sparse retrieval.
 
-Simple Okapi BM25 build/search with whitespace tokenization. Designed to
-persist/load as JSON alongside FAISS artifacts for hybrid retrieval.
+Simple Okapi BM25 build/search with regex word tokenization. Designed to
+persist/load alongside FAISS artifacts for hybrid retrieval.
+
+Scoring runs over an inverted index (term -> posting docs / tfs, as flat NumPy
+arrays) compiled once per loaded model, so a query touches only documents that
+contain one of its terms; with ``numba`` installed the per-query kernel is
+JIT-compiled, otherwise each posting list is a vectorized NumPy update. ``save_bm25`` stores those arrays
+in binary form in ``bm25.npz``; ``bm25.json`` keeps only the scalar parameters.
+Loads are cached per file mtime, so hybrid queries do not re-read the model.
+Older full-JSON models still load.
 """
 
 from __future__ import annotations
 
-import json
 import math
 import os
+import re
+import tempfile
 from collections import Counter, defaultdict
-from typing import Any, Dict, List, Tuple
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.utils.io_utils import read_json, write_json
+
+try:
+    from numba import njit
+except Exception:  # pragma: no cover - import optional
+    njit = None  # type: ignore
+
 
+# Tokenizer versions, recorded in each model so queries are tokenized the way
+# the corpus was: 1 = lowercased whitespace split (models without a version),
+# 2 = lowercased Unicode word runs (punctuation no longer sticks to terms).
+TOKENIZER_VERSION = 2
+_WORD_RX = re.compile(r"\w+")
 
-def _tokenize(text: str) -> List[str]:
+
+def _tokenize(text: str, version: int = TOKENIZER_VERSION) -> List[str]:
+    if version >= 2:
+        return _WORD_RX.findall(text.lower())
     return [t.lower() for t in text.split() if t.strip()]
 
 
-def build_bm25_model(texts: List[str], k1: float = 1.5, b: float = 0.75) -> Dict[str, Any]:
-    """Build a BM25 model from a list of texts."""
+@lru_cache(maxsize=1024)
+def _tokenize_query(query: str, version: int = TOKENIZER_VERSION) -> Tuple[str, ...]:
+    # Section queries repeat on every run; tokenize each distinct string once
+    return tuple(_tokenize(query, version))
+
+
+def _len_norm(doc_lens: Any, k1: float, b: float, avgdl: float) -> np.ndarray:
+    """Per-doc ``k1 * (1 - b + b * dl / avgdl)``; empty docs count as length 1."""
+    dl = np.maximum(np.asarray(doc_lens, dtype=np.float64), 1.0)
+    return k1 * (1 - b + b * (dl / (avgdl or 1.0)))
+
+
+def build_bm25_model(
+    texts: List[str], k1: float = 1.5, b: float = 0.75, headings: Optional[Sequence[str]] = None
+) -> Dict[str, Any]:
+    """Build a BM25 model from a list of texts.
+
+    ``headings``, if given, is parallel to ``texts``; each document is then
+    indexed as its heading followed by its text, without concatenating them.
+    """
     N = len(texts)
     doc_tfs: List[Dict[str, int]] = []
     df = Counter()
     doc_lens = []
-    for t in texts:
+    for i, t in enumerate(texts):
         toks = _tokenize(t)
+        if headings is not None:
+            toks = _tokenize(headings[i]) + toks
         tf = Counter(toks)
         doc_tfs.append(dict(tf))
         doc_lens.append(len(toks))
@@ -39,49 +87,206 @@ def build_bm25_model(texts: List[str], k1: float = 1.5, b: float = 0.75) -> Dict
         "b": b,
         "N": N,
         "avgdl": avgdl,
+        "tokenizer": TOKENIZER_VERSION,
         "idf": idf,
         "doc_tfs": doc_tfs,
         "doc_lens": doc_lens,
+        # Length normalization is query-independent: computed once at build
+        "len_norm": _len_norm(doc_lens, k1, b, avgdl).tolist(),
     }
 
 
 def bm25_scores(model: Dict[str, Any], query: str) -> List[float]:
-    q_terms = _tokenize(query)
-    idf = model["idf"]
-    k1 = model["k1"]
-    b = model["b"]
-    avgdl = model["avgdl"] or 1.0
-    doc_tfs = model["doc_tfs"]
-    doc_lens = model["doc_lens"]
-    scores = [0.0] * len(doc_tfs)
-    for i, tf in enumerate(doc_tfs):
-        dl = doc_lens[i] or 1
-        s = 0.0
-        for term in q_terms:
-            if term not in tf:
-                continue
-            term_idf = idf.get(term, 0.0)
-            f = tf[term]
-            denom = f + k1 * (1 - b + b * (dl / avgdl))
-            s += term_idf * ((f * (k1 + 1)) / denom)
-        scores[i] = s
+    arr = _compiled(model)
+    return _score(arr, _query_terms(arr, query)).tolist()
+
+
+def _score_postings_numpy(tids, idf, post_ptr, post_docs, post_tfs, len_norm, k1):
+    scores = np.zeros(len(len_norm))
+    for t in tids:
+        lo, hi = post_ptr[t], post_ptr[t + 1]
+        docs = post_docs[lo:hi]
+        f = post_tfs[lo:hi]
+        # docs within one posting list are unique, so fancy-index += is safe
+        scores[docs] += idf[t] * ((f * (k1 + 1.0)) / (f + len_norm[docs]))
     return scores
 
 
+if njit is not None:
+
+    @njit(cache=True)
+    def _score_postings_jit(tids, idf, post_ptr, post_docs, post_tfs, len_norm, k1):  # pragma: no cover - needs numba
+        scores = np.zeros(len(len_norm))
+        for t in tids:
+            for p in range(post_ptr[t], post_ptr[t + 1]):
+                d = post_docs[p]
+                f = post_tfs[p]
+                scores[d] += idf[t] * ((f * (k1 + 1.0)) / (f + len_norm[d]))
+        return scores
+
+    _score_postings = _score_postings_jit
+else:
+    _score_postings = _score_postings_numpy
+
+
+def _score(arr: Dict[str, Any], tids: np.ndarray) -> np.ndarray:
+    if not len(tids):
+        return np.zeros(len(arr["len_norm"]))
+    return _score_postings(
+        tids, arr["idf"], arr["post_ptr"], arr["post_docs"], arr["post_tfs"], arr["len_norm"], arr["k1"]
+    )
+
+
+def _compiled(model: Dict[str, Any]) -> Dict[str, Any]:
+    """Posting arrays for ``model``, built on first use and kept on the model dict."""
+    arrays = model.get("_compiled")
+    if arrays is not None:
+        return arrays
+    k1 = float(model["k1"])
+    b = float(model["b"])
+    avgdl = model["avgdl"] or 1.0
+    vocab: Dict[str, int] = {}
+    postings: List[List[Tuple[int, int]]] = []
+    for d, tf in enumerate(model["doc_tfs"]):
+        for term, f in tf.items():
+            tid = vocab.get(term)
+            if tid is None:
+                tid = vocab[term] = len(postings)
+                postings.append([])
+            postings[tid].append((d, f))
+    idf_map = model["idf"]
+    idf = np.zeros(len(vocab))
+    for term, tid in vocab.items():
+        idf[tid] = idf_map.get(term, 0.0)
+    post_ptr = np.zeros(len(postings) + 1, dtype=np.int64)
+    post_ptr[1:] = np.cumsum([len(p) for p in postings])
+    flat = [pair for plist in postings for pair in plist]
+    post_docs = np.fromiter((d for d, _ in flat), dtype=np.int64, count=len(flat))
+    post_tfs = np.fromiter((f for _, f in flat), dtype=np.float64, count=len(flat))
+    len_norm = model.get("len_norm")
+    if len_norm is None:  # models saved before len_norm was stored
+        len_norm = _len_norm(model["doc_lens"], k1, b, avgdl)
+    arrays = _assemble(vocab, idf, post_ptr, post_docs, post_tfs, len_norm, k1, int(model.get("tokenizer", 1)))
+    model["_compiled"] = arrays
+    return arrays
+
+
+def _assemble(vocab, idf, post_ptr, post_docs, post_tfs, len_norm, k1, tokenizer) -> Dict[str, Any]:
+    return {
+        "tokenizer": tokenizer,
+        "vocab": vocab,
+        "idf": np.asarray(idf, dtype=np.float64),
+        "post_ptr": np.asarray(post_ptr, dtype=np.int64),
+        "post_docs": np.asarray(post_docs, dtype=np.int64),
+        "post_tfs": np.asarray(post_tfs, dtype=np.float64),
+        "len_norm": np.asarray(len_norm, dtype=np.float64),
+        "k1": k1,
+    }
+
+
+def _query_terms(arr: Dict[str, Any], query: str) -> np.ndarray:
+    """Vocabulary ids of the query tokens, in query order (repeats kept, unknowns dropped)."""
+    vocab = arr["vocab"]
+    terms = _tokenize_query(query, arr["tokenizer"])
+    return np.asarray([vocab[t] for t in terms if t in vocab], dtype=np.int64)
+
+
 def bm25_top_k(model: Dict[str, Any], query: str, k: int = 30) -> List[Tuple[int, float]]:
-    scores = bm25_scores(model, query)
-    idx = list(range(len(scores)))
-    idx.sort(key=lambda i: scores[i], reverse=True)
-    return [(i, scores[i]) for i in idx[:k] if scores[i] > 0.0]
+    """Top-``k`` (doc index, score) with score > 0, best first; ties by doc index."""
+    arr = _compiled(model)
+    tids = _query_terms(arr, query)
+    if k <= 0 or not len(tids):
+        return []
+    scores = _score(arr, tids)
+    pos = np.flatnonzero(scores > 0.0)
+    if pos.size > k:
+        cand = scores[pos]
+        kth = np.partition(cand, cand.size - k)[cand.size - k]
+        above = pos[cand > kth]
+        ties = pos[cand == kth][: k - above.size]
+        pos = np.concatenate((above, ties))
+    order = np.lexsort((pos, -scores[pos]))
+    return [(int(i), float(scores[i])) for i in pos[order]]
+
+
+def _arrays_path(path: str) -> str:
+    return os.path.splitext(path)[0] + ".npz"
 
 
 def save_bm25(path: str, model: Dict[str, Any]) -> None:
+    """Write the compiled posting arrays (``<name>.npz``) plus a small JSON header.
+
+    The per-document term counts are not serialized as text; the npz holds
+    everything scoring needs.
+    """
     os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(model, f)
+    arr = _compiled(model)
+    header = {k: model[k] for k in ("k1", "b", "N", "avgdl")}
+    header["tokenizer"] = arr["tokenizer"]
+    header["arrays"] = os.path.basename(_arrays_path(path))
+    write_json(path, header, indent=None)
+    vocab = arr["vocab"]
+    npz_path = _arrays_path(path)
+    fd, tmp = tempfile.mkstemp(prefix=".tmp_", suffix=".npz", dir=os.path.dirname(npz_path) or ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(
+                f,
+                terms=np.array(sorted(vocab, key=vocab.__getitem__), dtype=str),
+                idf=arr["idf"],
+                post_ptr=arr["post_ptr"],
+                post_docs=arr["post_docs"].astype(np.int32),
+                post_tfs=arr["post_tfs"].astype(np.int32),
+                len_norm=arr["len_norm"],
+                params=np.array(
+                    [model["k1"], model["b"], model["avgdl"], model["N"], arr["tokenizer"]], dtype=np.float64
+                ),
+            )
+        os.replace(tmp, npz_path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+@lru_cache(maxsize=8)
+def _load_bm25_cached(path: str, stamp: int) -> Dict[str, Any]:
+    # stamp (file mtime) is part of the key only
+    if path.endswith(".npz"):
+        with np.load(path, allow_pickle=False) as z:
+            if "post_ptr" not in z.files:
+                # Earlier doc-major array layout: rebuild from the JSON model
+                return _load_bm25_cached(os.path.splitext(path)[0] + ".json", -1)
+            k1, b, avgdl, n, tok = (float(x) for x in z["params"])
+            vocab = {str(t): i for i, t in enumerate(z["terms"].tolist())}
+            model: Dict[str, Any] = {"k1": k1, "b": b, "N": int(n), "avgdl": avgdl, "tokenizer": int(tok)}
+            model["_compiled"] = _assemble(
+                vocab, z["idf"], z["post_ptr"], z["post_docs"], z["post_tfs"], z["len_norm"], k1, int(tok)
+            )
+        return model
+    model = read_json(path)  # orjson when installed; legacy models carry every doc's term counts
+    if model is None:
+        raise FileNotFoundError(path)
+    if "doc_tfs" not in model:
+        # Header-only JSON: the postings live in the npz
+        npz_path = _arrays_path(path)
+        return _load_bm25_cached(npz_path, os.stat(npz_path).st_mtime_ns)
+    return model
 
 
 def load_bm25(path: str) -> Dict[str, Any]:
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    """Load a saved model; repeat loads of an unchanged file return the cached model.
 
+    Prefers the compiled ``.npz`` arrays written next to the JSON (no JSON
+    parse or posting rebuild) unless the JSON is newer, as with a full JSON
+    model written by hand or by an older build. The returned dict is
+    shared and must be treated as read-only.
+    """
+    json_stamp = os.stat(path).st_mtime_ns
+    npz_path = _arrays_path(path)
+    try:
+        npz_stamp = os.stat(npz_path).st_mtime_ns
+    except OSError:
+        npz_stamp = -1
+    if npz_stamp >= json_stamp:
+        return _load_bm25_cached(npz_path, npz_stamp)
+    return _load_bm25_cached(path, json_stamp)
@@ -1,9 +1,14 @@
-"""DOCX parsing helpers using python-docx.
+"""DOCX helpers using python-docx.
 
 Functions:
 - ``extract_docx_blocks(path)``: returns a list of paragraph blocks with
   heading levels when available. Page numbers are not available in DOCX;
   we set page=1 as a placeholder.
+- ``write_markdown_docx(markdown, out_path, reference_doc)``: writes the
+  small Markdown subset used by the ICF assembly (``##`` headings, ``*``
+  bullets, ``1.`` numbers, indented sub-items, ``**bold**``/``*italic*``)
+  straight to a DOCX. The reference doc contributes styles and page setup
+  only; its body content is dropped.
 
 Block schema:
 - ``page``: always 1 (DOCX has no fixed pagination here)
@@ -13,14 +18,23 @@ Block schema:
 
 from __future__ import annotations
 
+import re
 from typing import List, Dict, Any, Optional
 
 try:
     from docx import Document
+    from docx.oxml.ns import qn
+    from docx.shared import Pt
 except Exception:  # pragma: no cover - import optional
     Document = None  # type: ignore
 
 
+_HEADING_RX = re.compile(r"^(#{1,6})\s+(.*)$")
+_BULLET_RX = re.compile(r"^([ \t]*)\*\s+(.*)$")
+_NUMBER_RX = re.compile(r"^([ \t]*)\d+\.\s+(.*)$")
+_INLINE_RX = re.compile(r"(\*\*[^*]+?\*\*|\*[^*\s][^*]*?\*)")
+
+
 def _heading_level(style_name: Optional[str]) -> Optional[int]:
     if not style_name:
         return None
@@ -51,3 +65,160 @@ def extract_docx_blocks(path: str) -> List[Dict[str, Any]]:
         blocks.append({"page": 1, "text": text, "level": level})
     return blocks
 
+
+
+def _add_inline(par: Any, text: str) -> None:
+    # python-docx maps "\t" to a tab and "\n" to a line break within a run
+    for part in _INLINE_RX.split(text):
+        if not part:
+            continue
+        if part.startswith("**") and part.endswith("**") and len(part) > 4:
+            par.add_run(part[2:-2]).bold = True
+        elif part.startswith("*") and part.endswith("*") and len(part) > 2:
+            par.add_run(part[1:-1]).italic = True
+        else:
+            par.add_run(part)
+
+
+def _clear_body(doc: Any) -> None:
+    # Keep the final sectPr (page size, margins, headers/footers); drop sample content
+    body = doc.element.body
+    for child in list(body):
+        if child.tag != qn("w:sectPr"):
+            body.remove(child)
+
+
+def _list_style(base: str, level: int, styles: Any) -> Optional[str]:
+    # "List Bullet", "List Bullet 2", ... falling back to the shallowest style present
+    for lvl in range(level, -1, -1):
+        name = base if lvl == 0 else f"{base} {lvl + 1}"
+        if name in styles:
+            return name
+    return None
+
+
+def _style_num_pr(doc: Any, style_name: Optional[str]) -> Any:
+    # The style's own list numbering (w:numPr with a numId), or None
+    if not style_name:
+        return None
+    ppr = doc.styles[style_name].element.pPr
+    num_pr = ppr.numPr if ppr is not None else None
+    return num_pr if num_pr is not None and num_pr.numId is not None else None
+
+
+def _restart_numbering(doc: Any, style_name: str) -> Optional[int]:
+    """New ``w:num`` for the style's list definition, starting again at 1.
+
+    Paragraphs pointing at it number independently of earlier lists that use
+    the same style. Returns None if the style carries no numbering.
+    """
+    num_pr = _style_num_pr(doc, style_name)
+    if num_pr is None:
+        return None
+    try:
+        numbering = doc.part.numbering_part.element
+        base = numbering.num_having_numId(num_pr.numId.val)
+    except (KeyError, NotImplementedError):
+        # Style points at a list definition the document does not contain
+        return None
+    ilvl = num_pr.ilvl.val if num_pr.ilvl is not None else 0
+    num = numbering.add_num(base.abstractNumId.val)
+    num.add_lvlOverride(ilvl=ilvl).add_startOverride(1)
+    return num.numId
+
+
+def write_markdown_docx(markdown: str, out_path: str, reference_doc: Optional[str] = None) -> bool:
+    """Render assembly Markdown to ``out_path``, styled by ``reference_doc``.
+
+    Paragraph lines separated by single newlines are kept as line breaks.
+    Citations such as ``[[p. 3 | Section: 2]]`` pass through verbatim.
+    Each numbered list restarts at 1; deeper-indented items use the
+    "List Bullet 2"/"List Number 2"... styles when the reference doc has them.
+    Reference docs without numbered list styles (e.g. pandoc-made ones) get
+    literal "•" / "N." markers on indented paragraphs instead.
+    Returns False (writing nothing) if python-docx is unavailable.
+    """
+    if Document is None:
+        return False
+
+    if reference_doc:
+        doc = Document(reference_doc)
+        _clear_body(doc)
+    else:
+        doc = Document()
+    styles = {s.name for s in doc.styles}
+    para: List[str] = []
+    # Open list state: indent width per nesting level; per level for numbered
+    # items, the restarted numId and the item count (reset when the list ends)
+    indents: List[int] = []
+    nums: Dict[int, Optional[int]] = {}
+    counts: Dict[int, int] = {}
+
+    def end_list() -> None:
+        indents.clear()
+        nums.clear()
+        counts.clear()
+
+    def flush() -> None:
+        if para:
+            _add_inline(doc.add_paragraph(), "\n".join(para))
+            para.clear()
+
+    def add_item(indent: str, text: str, base: str) -> None:
+        flush()
+        width = len(indent.expandtabs(4))
+        while indents and indents[-1] > width:
+            indents.pop()
+        if not indents or width > indents[-1]:
+            indents.append(width)
+        level = len(indents) - 1
+        numbered = base == "List Number"
+        for lvl in [lvl for lvl in counts if lvl > level or (lvl == level and not numbered)]:
+            nums.pop(lvl, None)
+            del counts[lvl]
+        if numbered:
+            counts[level] = counts.get(level, 0) + 1
+        style = _list_style(base, level, styles)
+        if _style_num_pr(doc, style) is None:
+            # No list numbering available: keep the marker as text
+            p = doc.add_paragraph()
+            p.paragraph_format.left_indent = Pt(18 * (level + 1))
+            p.add_run(f"{counts[level]}. " if numbered else "\u2022 ")
+            _add_inline(p, text)
+            return
+        p = doc.add_paragraph(style=style)
+        if numbered:
+            if level not in nums:
+                nums[level] = _restart_numbering(doc, style)
+            if nums[level] is not None:
+                p._p.get_or_add_pPr().get_or_add_numPr().get_or_add_numId().val = nums[level]
+        _add_inline(p, text)
+
+    for ln in markdown.splitlines():
+        if not ln.strip():
+            flush()
+            continue
+        m = _HEADING_RX.match(ln)
+        if m:
+            flush()
+            end_list()
+            level = len(m.group(1))
+            if f"Heading {level}" in styles:
+                doc.add_heading(m.group(2).strip(), level=level)
+            else:
+                doc.add_paragraph().add_run(m.group(2).strip()).bold = True
+            continue
+        m = _BULLET_RX.match(ln)
+        if m:
+            add_item(m.group(1), m.group(2), "List Bullet")
+            continue
+        m = _NUMBER_RX.match(ln)
+        if m:
+            add_item(m.group(1), m.group(2), "List Number")
+            continue
+        end_list()
+        para.append(ln)
+    flush()
+
+    doc.save(out_path)
+    return True
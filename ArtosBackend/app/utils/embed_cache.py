@@ -0,0 +1,56 @@
+"""On-disk cache of query embeddings.
+
+Provides:
+- ``load_embeddings(cache_dir, model, texts)``: return ``{text: vector}`` for cached texts.
+- ``save_embeddings(cache_dir, model, pairs)``: persist ``(text, vector)`` pairs.
+
+Entries live at ``<cache_dir>/<sha1(model + "\\n" + text)>.npy`` as float32
+arrays, so fixed section queries survive process restarts and are embedded
+once per model. There is no eviction: callers persist only a fixed set of
+texts (RetrievalService saves the section-template queries, not ad-hoc
+ones). Unreadable entries are treated as misses.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from app.utils.io_utils import ensure_dir
+
+
+def _entry_path(cache_dir: str, model: str, text: str) -> str:
+    key = hashlib.sha1(f"{model}\n{text}".encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, f"{key}.npy")
+
+
+def load_embeddings(cache_dir: str, model: str, texts: Iterable[str]) -> Dict[str, List[float]]:
+    found: Dict[str, List[float]] = {}
+    for text in texts:
+        try:
+            found[text] = np.load(_entry_path(cache_dir, model, text)).tolist()
+        except (OSError, ValueError):
+            continue
+    return found
+
+
+def save_embeddings(cache_dir: str, model: str, pairs: Sequence[Tuple[str, Sequence[float]]]) -> None:
+    if not pairs:
+        return
+    ensure_dir(cache_dir)
+    for text, vec in pairs:
+        path = _entry_path(cache_dir, model, text)
+        fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".npy.tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, np.asarray(vec, dtype=np.float32))
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
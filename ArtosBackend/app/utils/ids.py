@@ -4,25 +4,38 @@ Provides:
 - ``new_id(prefix)``: returns a time-sortable ID string with the given prefix
   (e.g., ``file_0001695400000-3f2a...``). Not a true ULID but stable and sortable.
 - ``compute_sha1(data)``: returns a sha1 hex digest for strings or bytes.
+- ``compute_chunk_id(data)``: returns a 40-hex content ID for chunks (sha256-based).
 """
 
 from __future__ import annotations
 
 import hashlib
 import os
+import random
 import time
-import uuid
 from typing import Union
 
+# In-process PRNG for the random ID suffix: IDs need uniqueness, not secrecy,
+# so there is no per-call urandom read. Reseeded in forked children so worker
+# processes do not replay the parent's sequence.
+_rng = random.Random(os.urandom(16))
+
+
+def _reseed() -> None:
+    _rng.seed(os.urandom(16))
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reseed)
+
 
 def new_id(prefix: str) -> str:
     """Generate a time-sortable unique ID with the given prefix.
 
-    Format: ``{prefix}_{millis}-{uuid16}``
+    Format: ``{prefix}_{millis}-{rand16}`` (64 random bits as 16 hex chars)
     """
-    millis = int(time.time() * 1000)
-    rand = uuid.uuid4().hex[:16]
-    return f"{prefix}_{millis:013d}-{rand}"
+    millis = time.time_ns() // 1_000_000
+    return f"{prefix}_{millis:013d}-{_rng.getrandbits(64):016x}"
 
 
 def compute_sha1(data: Union[str, bytes]) -> str:
@@ -37,3 +50,13 @@ def compute_sha1(data: Union[str, bytes]) -> str:
     h.update(data)
     return h.hexdigest()
 
+
+def compute_chunk_id(data: Union[str, bytes]) -> str:
+    """Compute a chunk ID: sha256 truncated to 40 hex chars.
+
+    Same width as the sha1 IDs it replaces, but sha256 has dedicated
+    instructions (SHA-NI / ARMv8 crypto) on current CPUs.
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8", errors="ignore")
+    return hashlib.sha256(data).hexdigest()[:40]
@@ -3,8 +3,12 @@
 Provides:
 - ``ensure_dir(path)``: create directories if missing (no error if exists).
 - ``read_json(path, default=None)``: read JSON file; return default on missing.
-- ``write_json(path, data)``: atomic write of JSON to file.
+- ``write_json(path, data, indent=2)``: atomic write of JSON to file
+  (``indent=None`` for compact output).
 - ``file_sha1(path)``: compute sha1 digest of a file.
+
+JSON (de)serialization uses ``orjson`` when installed (several times faster
+on snippet-heavy run artifacts) and falls back to the stdlib ``json`` module.
 """
 
 from __future__ import annotations
@@ -15,6 +19,15 @@ import tempfile
 from typing import Any, Optional
 import hashlib
 
+try:
+    import orjson
+except Exception:  # pragma: no cover - import optional
+    orjson = None  # type: ignore
+
+if orjson is not None:
+    _ORJSON_COMPACT_OPTS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    _ORJSON_OPTS = _ORJSON_COMPACT_OPTS | orjson.OPT_INDENT_2
+
 
 def ensure_dir(path: str) -> None:
     os.makedirs(path, exist_ok=True)
@@ -22,18 +35,33 @@ def ensure_dir(path: str) -> None:
 
 def read_json(path: str, default: Optional[Any] = None) -> Any:
     try:
+        if orjson is not None:
+            with open(path, "rb") as f:
+                return orjson.loads(f.read())
         with open(path, "r", encoding="utf-8") as f:
             return json.load(f)
     except FileNotFoundError:
         return default
 
 
-def write_json(path: str, data: Any) -> None:
+def _dump_json_bytes(data: Any, indent: Optional[int] = 2) -> bytes:
+    if orjson is not None and indent in (2, None):
+        try:
+            return orjson.dumps(data, option=_ORJSON_OPTS if indent else _ORJSON_COMPACT_OPTS)
+        except TypeError:
+            # types orjson does not handle natively; let the stdlib try
+            pass
+    if indent is None:
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return json.dumps(data, ensure_ascii=False, indent=indent).encode("utf-8")
+
+
+def write_json(path: str, data: Any, indent: Optional[int] = 2) -> None:
     ensure_dir(os.path.dirname(path) or ".")
     fd, tmp = tempfile.mkstemp(prefix=".tmp_", dir=os.path.dirname(path) or ".")
     try:
-        with os.fdopen(fd, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        with os.fdopen(fd, "wb") as f:
+            f.write(_dump_json_bytes(data, indent))
         os.replace(tmp, path)
     finally:
         try:
@@ -44,12 +72,16 @@ def write_json(path: str, data: Any) -> None:
 
 
 def file_sha1(path: str, chunk_size: int = 1024 * 1024) -> str:
-    sha1 = hashlib.sha1()
     with open(path, "rb") as f:
+        if hasattr(hashlib, "file_digest"):  # Python 3.11+: reads without per-chunk copies
+            return hashlib.file_digest(f, "sha1").hexdigest()
+        sha1 = hashlib.sha1()
+        buf = bytearray(chunk_size)
+        view = memoryview(buf)
         while True:
-            chunk = f.read(chunk_size)
-            if not chunk:
+            n = f.readinto(buf)
+            if not n:
                 break
-            sha1.update(chunk)
+            sha1.update(view[:n])
     return sha1.hexdigest()
 
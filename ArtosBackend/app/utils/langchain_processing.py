@@ -2,30 +2,55 @@
 
 This module provides a simpler, more robust alternative to the custom
 PDF parsing, section detection, and chunking logic.
+
+Functions:
+- ``count_tokens(text)``: cl100k_base token count (tiktoken is imported and
+  its encoder built on first call, then reused).
+- ``count_tokens_batch(texts)``: the same for many texts, encoded in parallel
+  by tiktoken's native threads.
 """
 
 from __future__ import annotations
 
-import hashlib
-from typing import Any, Dict, List, Optional
-import logging
-
-try:
-    from langchain_community.document_loaders import PyMuPDFLoader
-    from langchain_text_splitters import RecursiveCharacterTextSplitter
-    from langchain.schema import Document
-    import tiktoken
-except ImportError as e:
-    raise ImportError(f"Required LangChain dependencies not installed: {e}")
+import os
+from functools import lru_cache
+from typing import Any, List, Optional, Sequence
 
 
-def count_tokens(text: str) -> int:
-    """Count tokens using tiktoken, with fallback to character-based estimation."""
+@lru_cache(maxsize=1)
+def _encoding() -> Optional[Any]:
+    """The cl100k_base encoder, resolved once; None if tiktoken is unavailable."""
     try:
-        enc = tiktoken.get_encoding("cl100k_base")
-        return len(enc.encode(text))
+        import tiktoken
+
+        return tiktoken.get_encoding("cl100k_base")
     except Exception:
-        # Fallback: ~4 chars per token
-        return max(1, len(text) // 4)
+        return None
 
 
+def count_tokens(text: str) -> int:
+    """Count tokens using tiktoken, with fallback to character-based estimation."""
+    enc = _encoding()
+    if enc is not None:
+        try:
+            return len(enc.encode(text))
+        except Exception:
+            pass
+    # Fallback: ~4 chars per token
+    return max(1, len(text) // 4)
+
+
+def count_tokens_batch(texts: Sequence[str]) -> List[int]:
+    """Token counts for ``texts`` (same order), batching the BPE work across threads.
+
+    ``encode_ordinary_batch`` releases the GIL, so large ingests use all cores.
+    Falls back to ``count_tokens`` per text if batch encoding is unavailable.
+    """
+    enc = _encoding()
+    if enc is not None and texts:
+        try:
+            batch = enc.encode_ordinary_batch(list(texts), num_threads=os.cpu_count() or 4)
+            return [len(toks) for toks in batch]
+        except Exception:
+            pass
+    return [count_tokens(t) for t in texts]
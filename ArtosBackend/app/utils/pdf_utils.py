@@ -0,0 +1,44 @@
+"""PDF inspection helpers using PyMuPDF.
+
+Functions:
+- ``pdf_info(path)``: returns ``(needs_pass, page_count)`` for a PDF. The
+  result is cached per ``(path, mtime)`` so the upload validation and the
+  later ingest step share a single parse of the file.
+
+PyMuPDF is imported on first use rather than at module load, so importing
+the routes that use this module does not load it at startup. If PyMuPDF is
+unavailable, returns ``None`` and callers skip the check.
+"""
+
+from __future__ import annotations
+
+import os
+from functools import lru_cache
+from typing import Optional, Tuple
+
+
+@lru_cache(maxsize=8)
+def _open_pdf(path: str, mtime: float) -> Optional[Tuple[bool, int]]:
+    # mtime is part of the cache key only; a rewritten file gets a new entry
+    import fitz  # PyMuPDF
+
+    try:
+        with fitz.open(path) as doc:
+            # older versions: check needs_pass; newer: is_encrypted
+            needs = bool(getattr(doc, "needs_pass", False) or getattr(doc, "is_encrypted", False))
+            return needs, doc.page_count
+    except Exception:
+        return None
+
+
+def pdf_info(path: str) -> Optional[Tuple[bool, int]]:
+    """Return ``(needs_pass, page_count)`` or None if the PDF cannot be opened."""
+    try:
+        import fitz  # noqa: F401  # PyMuPDF
+    except Exception:  # pragma: no cover - import optional
+        return None
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    return _open_pdf(os.path.abspath(path), mtime)
@@ -2,5 +2,60 @@
 
 Provide helpers for counting tokens, truncating to model limits,
 and optional readability checks (e.g., Flesch-Kincaid). Placeholder only.
+
+Functions:
+- ``extract_json_block(text, opener)``: returns the first balanced JSON
+  object (``"{"``) or array (``"["``) embedded in free text, in one linear
+  scan (no backtracking regex).
+- ``loads_json_lenient(text, opener)``: ``json.loads`` on the whole text,
+  falling back to the first embedded block; raises ``ValueError`` if neither
+  parses.
 """
 
+from __future__ import annotations
+
+import json
+from typing import Any, Optional
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def extract_json_block(text: str, opener: str = "{") -> Optional[str]:
+    """Return the first balanced ``{...}`` / ``[...]`` substring, or None."""
+    closer = _CLOSERS[opener]
+    start = text.find(opener)
+    if start == -1:
+        return None
+    depth = 0
+    in_str = False
+    escape = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_str:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_str = False
+        elif ch == '"':
+            in_str = True
+        elif ch == opener:
+            depth += 1
+        elif ch == closer:
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
+
+
+def loads_json_lenient(text: str, opener: str = "{") -> Any:
+    """Parse LLM output that should be JSON but may carry prose or code fences."""
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    block = extract_json_block(text, opener)
+    if block is None:
+        raise ValueError("no JSON block found")
+    return json.loads(block)
@@ -0,0 +1,83 @@
+"""Out-of-line storage for chunk texts, read through a memory map.
+
+Provides:
+- ``write_text_store(dir_path, texts)``: write ``chunks.bin`` (concatenated UTF-8)
+  and ``chunks.offsets.npy`` (int64 ``[start, end)`` pairs), one row per text.
+- ``open_text_store(dir_path)``: return a cached ``TextStore`` for the directory,
+  or None when no store has been written there.
+
+The FAISS docstore keeps only chunk metadata, so loading an index no longer
+unpickles every chunk's text; callers read the few texts they return by row.
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+from functools import lru_cache
+from typing import Optional, Sequence
+
+import numpy as np
+
+BIN_NAME = "chunks.bin"
+OFFSETS_NAME = "chunks.offsets.npy"
+
+
+class TextStore:
+    """Row-addressable texts backed by a read-only memory map."""
+
+    def __init__(self, bin_path: str, offsets: np.ndarray):
+        self.offsets = offsets
+        self._data = np.memmap(bin_path, dtype=np.uint8, mode="r") if os.path.getsize(bin_path) else None
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def get(self, row: int) -> str:
+        if row < 0 or row >= len(self.offsets) or self._data is None:
+            return ""
+        start, end = self.offsets[row]
+        return self._data[start:end].tobytes().decode("utf-8")
+
+
+def _replace_atomic(path: str, payload: bytes) -> None:
+    fd, tmp = tempfile.mkstemp(prefix=".tmp_", dir=os.path.dirname(path) or ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def write_text_store(dir_path: str, texts: Sequence[str]) -> None:
+    os.makedirs(dir_path, exist_ok=True)
+    encoded = [t.encode("utf-8") for t in texts]
+    ends = np.cumsum([len(b) for b in encoded], dtype=np.int64)
+    offsets = np.stack((ends - [len(b) for b in encoded], ends), axis=1) if encoded else np.zeros((0, 2), np.int64)
+    _replace_atomic(os.path.join(dir_path, BIN_NAME), b"".join(encoded))
+    # Offsets last: their mtime is the cache key for readers
+    fd, tmp = tempfile.mkstemp(prefix=".tmp_", dir=dir_path)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, offsets.astype(np.int64))
+        os.replace(tmp, os.path.join(dir_path, OFFSETS_NAME))
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+@lru_cache(maxsize=8)
+def _open_cached(dir_path: str, stamp: int) -> TextStore:
+    # stamp (offsets mtime) is part of the key only
+    offsets = np.load(os.path.join(dir_path, OFFSETS_NAME))
+    return TextStore(os.path.join(dir_path, BIN_NAME), offsets)
+
+
+def open_text_store(dir_path: str) -> Optional[TextStore]:
+    try:
+        stamp = os.stat(os.path.join(dir_path, OFFSETS_NAME)).st_mtime_ns
+    except OSError:
+        return None
+    return _open_cached(dir_path, stamp)